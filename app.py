@@ -1,30 +1,123 @@
+import hashlib
+import json
+import logging
+import logging.handlers
 import os
+import queue
+import shutil
 import time
 import threading
 import uuid
-from flask import Flask, render_template, request, jsonify, send_file
+from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import unquote
+from flask import Flask, Response, render_template, request, jsonify, send_file
+from flask.json.provider import DefaultJSONProvider
 
 from processing.tiff_handler import validate_tiff, convert_to_preview, extract_metadata
 from processing.georeferencer import run_georeferencing
 from processing.exporter import generate_kmz
 from processing.vector_handler import convert_to_geojson, SUPPORTED_EXTENSIONS
 from processing.metadata_georeferencer import georeference_from_metadata
+from processing.config import UPLOAD_FOLDER, TEMP_EXTRACT_FOLDER
+
+try:
+    import orjson
+    _HAS_ORJSON = True
+except ImportError:
+    _HAS_ORJSON = False
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson.
+
+    Overlay responses embed multi-megabyte GeoJSON; orjson encodes it several
+    times faster than the stdlib and response() writes its bytes output
+    straight into the body without an intermediate str.
+    """
+    _options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY if _HAS_ORJSON else 0
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self._options).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=self._options)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+_log_listener = None
+
+
+def _configure_logging():
+    """Route all log records through a queue so stderr writes happen off the request threads."""
+    global _log_listener
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter('%(levelname)s %(name)s: %(message)s'))
+    _log_listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    _log_listener.start()
+
+    root = logging.getLogger()
+    root.handlers[:] = [logging.handlers.QueueHandler(log_queue)]
+    root.setLevel(LOG_LEVEL)
+
+
+def _init_pool_worker():
+    """Set up a process pool worker.
+
+    Logs go straight to stderr, since the parent's queue listener isn't
+    running here. OpenCV gets an equal share of the cores, so a full pool
+    of concurrent warps doesn't run cpu_count threads in every process.
+    """
+    logging.basicConfig(level=LOG_LEVEL, format='%(levelname)s %(name)s: %(message)s', force=True)
+
+    import cv2
+    cv2.setNumThreads(max(1, (os.cpu_count() or 2) // PROCESS_POOL_WORKERS))
+
+
+_configure_logging()
 
 app = Flask(__name__)
+if _HAS_ORJSON:
+    app.json = OrjsonProvider(app)
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-UPLOAD_FOLDER = os.path.join(BASE_DIR, 'static', 'uploads')
+# UPLOAD_FOLDER and TEMP_EXTRACT_FOLDER come from processing.config
 PREVIEW_FOLDER = os.path.join(BASE_DIR, 'static', 'previews')
 EXPORT_FOLDER = os.path.join(BASE_DIR, 'static', 'exports')
 OVERLAY_FOLDER = os.path.join(BASE_DIR, 'static', 'overlays')
-TEMP_EXTRACT_FOLDER = os.path.join(BASE_DIR, 'static', 'temp_extract')
-ALLOWED_EXTENSIONS = {'.tif', '.tiff', '.zip'}
-ALLOWED_OVERLAY_EXTENSIONS = set(SUPPORTED_EXTENSIONS.keys())
+# When set (e.g. '/_exports/'), downloads are handed to a fronting nginx via
+# X-Accel-Redirect; the prefix must be an internal location aliased to EXPORT_FOLDER.
+EXPORT_ACCEL_PREFIX = os.environ.get('EXPORT_ACCEL_PREFIX')
+ALLOWED_EXTENSIONS = frozenset({'.tif', '.tiff', '.zip'})
+ALLOWED_OVERLAY_EXTENSIONS = frozenset(SUPPORTED_EXTENSIONS)
 
 app.config['MAX_CONTENT_LENGTH'] = 500 * 1024 * 1024  # 500 MB
-
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1 MiB reads: fewer syscalls and hash updates per upload
+
+# CPU-heavy processing (PIL decode, warping, KMZ encode) runs in a process pool
+# so one large TIFF doesn't hold the GIL and stall other requests in this worker.
+# Each pool process can hold a fully decoded TIFF (~1.5 GB at the 500 MP limit),
+# and every gunicorn worker has its own pool, so budget roughly
+# WEB_CONCURRENCY x PROCESS_POOL_WORKERS x 1.5 GB before raising this.
+PROCESS_POOL_WORKERS = int(os.environ.get('PROCESS_POOL_WORKERS', min(2, os.cpu_count() or 2)))
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+# Background upload jobs; these threads mostly wait on the process pool
+_upload_jobs = ThreadPoolExecutor(max_workers=PROCESS_POOL_WORKERS)
+
+# Only create what's missing: one stat() per folder on each worker start,
+# instead of a mkdir() that fails with EEXIST followed by a stat()
 for folder in [UPLOAD_FOLDER, PREVIEW_FOLDER, EXPORT_FOLDER, OVERLAY_FOLDER, TEMP_EXTRACT_FOLDER]:
-    os.makedirs(folder, exist_ok=True)
+    if not os.path.isdir(folder):
+        os.makedirs(folder, exist_ok=True)
 
 
 # Global error handlers — always return JSON, never HTML
@@ -38,6 +131,264 @@ def too_large(e):
     return jsonify({'error': 'File too large (max 500 MB)'}), 413
 
 
+@app.before_request
+def reject_oversize_request():
+    """Refuse oversize uploads from the Content-Length header, before any body is read."""
+    length = request.content_length
+    if length is not None and length > app.config['MAX_CONTENT_LENGTH']:
+        return too_large(None)
+
+
+# Upload previews are written once per image_id and never change
+PREVIEW_CACHE_MAX_AGE = 365 * 24 * 3600
+
+
+@app.after_request
+def cache_static_previews(response):
+    """Mark upload previews as immutable so the browser never refetches them."""
+    if request.path.startswith('/static/previews/') and response.status_code in (200, 304):
+        response.cache_control.public = True
+        response.cache_control.max_age = PREVIEW_CACHE_MAX_AGE
+        response.cache_control.immutable = True
+    return response
+
+
+def _send_revalidated(path, **kwargs):
+    """send_file for outputs that are rewritten in place under the same URL.
+
+    The URL stays the same when georeferencing or export is re-run, so the
+    response must not be cached blindly. Instead the browser revalidates
+    with If-None-Match and gets a 304 while the file is unchanged.
+    """
+    response = send_file(path, conditional=True, etag=True, **kwargs)
+    response.cache_control.no_cache = True
+    return response
+
+
+def _get_process_pool():
+    """Return the shared process pool, creating it on first use."""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(max_workers=PROCESS_POOL_WORKERS,
+                                                initializer=_init_pool_worker)
+        return _process_pool
+
+
+def _discard_process_pool(pool):
+    """Drop a broken pool so the next _get_process_pool() call starts a new one.
+
+    A pool whose worker died (e.g. OOM-killed on a huge TIFF) rejects every
+    later task, so without this one crash would break all processing in this
+    gunicorn worker until it restarts.
+    """
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is pool:
+            _process_pool = None
+    app.logger.warning('Process pool broken; starting a new one')
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _submit_to_pool(fn, *args, **kwargs):
+    """Submit fn to the shared process pool, replacing the pool if it's broken."""
+    pool = _get_process_pool()
+    try:
+        return pool.submit(fn, *args, **kwargs)
+    except BrokenProcessPool:
+        _discard_process_pool(pool)
+        return _get_process_pool().submit(fn, *args, **kwargs)
+
+
+def _run_in_pool(fn, *args, **kwargs):
+    """Run fn in the shared process pool and return its result.
+
+    If the pool breaks before or while running it, the pool is replaced and
+    fn is retried once.
+    """
+    pool = _get_process_pool()
+    try:
+        return pool.submit(fn, *args, **kwargs).result()
+    except BrokenProcessPool:
+        _discard_process_pool(pool)
+        return _get_process_pool().submit(fn, *args, **kwargs).result()
+
+
+@dataclass(frozen=True)
+class ImagePaths:
+    """Every on-disk path derived from one image_id, built once per request.
+
+    The folders are absolute and fixed, so plain f-strings are enough and
+    avoid os.path.join's separator handling for each path.
+    """
+    tiff: str
+    zip: str
+    worldfile: str
+    footprint: str
+    metadata: str
+    result: str
+    preview: str
+    georef_tiff: str
+    bounds_json: str
+    overlay_jpg: str
+    overlay_png: str
+    kmz: str
+
+    @classmethod
+    def of(cls, image_id):
+        upload = f'{UPLOAD_FOLDER}{os.sep}{image_id}'
+        export = f'{EXPORT_FOLDER}{os.sep}{image_id}'
+        return cls(
+            tiff=f'{upload}.tiff',
+            zip=f'{upload}.zip',
+            worldfile=f'{upload}.tfw',
+            footprint=f'{upload}_footprint.geojson',
+            metadata=f'{upload}.meta.json',
+            result=f'{upload}.result.json',
+            preview=f'{PREVIEW_FOLDER}{os.sep}{image_id}.png',
+            georef_tiff=f'{export}_georef.tiff',
+            bounds_json=f'{export}_georef_bounds.json',
+            overlay_jpg=f'{export}_preview_overlay.jpg',
+            overlay_png=f'{export}_preview_overlay.png',
+            kmz=f'{export}.kmz',
+        )
+
+
+def _save_cached_metadata(image_id, metadata):
+    """Persist extracted metadata next to the TIFF so later requests skip re-parsing."""
+    try:
+        with open(ImagePaths.of(image_id).metadata, 'w') as f:
+            json.dump(metadata, f)
+    except OSError:
+        pass
+
+
+def _get_metadata(image_id, tiff_path):
+    """Return metadata cached at upload time, extracting it if no cache exists.
+
+    The cache is ignored if the TIFF has been rewritten since it was saved.
+    """
+    meta_path = ImagePaths.of(image_id).metadata
+    try:
+        if os.stat(meta_path).st_mtime_ns >= os.stat(tiff_path).st_mtime_ns:
+            with open(meta_path, 'r') as f:
+                return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        pass
+
+    metadata = extract_metadata(tiff_path)
+    _save_cached_metadata(image_id, metadata)
+    return metadata
+
+
+def _file_ext(filename):
+    """Return the lower-cased extension of filename, including the dot."""
+    i = filename.rfind('.')
+    return filename[i:].lower() if i >= 0 else ''
+
+
+def _upload_filename():
+    """Return the client-side filename of the uploaded file, or None if absent.
+
+    Raw uploads (Content-Type: application/octet-stream) carry the name in the
+    X-Filename header; multipart form uploads carry it on the 'file' part.
+    """
+    if request.mimetype == 'application/octet-stream':
+        return unquote(request.headers.get('X-Filename', ''))
+    if 'file' not in request.files:
+        return None
+    return request.files['file'].filename
+
+
+def _save_upload(dest_path):
+    """Write the uploaded file to dest_path and return its SHA-256 hex digest.
+
+    Raw uploads are streamed straight from the socket to disk in fixed-size
+    chunks, skipping Werkzeug's multipart parsing and spooled temp file.
+    The digest is computed on the same pass, so it costs no extra read.
+    """
+    if request.mimetype == 'application/octet-stream':
+        src = request.stream
+    else:
+        src = request.files['file'].stream
+
+    digest = hashlib.sha256()
+    with open(dest_path, 'wb') as out:
+        while chunk := src.read(UPLOAD_CHUNK_SIZE):
+            digest.update(chunk)
+            out.write(chunk)
+    return digest.hexdigest()
+
+
+# Files derived from an upload, relinked under a new image_id when a
+# byte-identical file is uploaded again. The TIFF and preview are required.
+_UPLOAD_ARTIFACTS = [
+    (UPLOAD_FOLDER, '.tiff', True),
+    (PREVIEW_FOLDER, '.png', True),
+    (UPLOAD_FOLDER, '.tfw', False),
+    (UPLOAD_FOLDER, '_footprint.geojson', False),
+    (UPLOAD_FOLDER, '.meta.json', False),
+]
+
+
+def _upload_record_path(digest):
+    return f'{UPLOAD_FOLDER}{os.sep}{digest}.upload.json'
+
+
+def _record_upload(digest, response):
+    """Remember the upload response for this content digest."""
+    # Write-then-rename so a crash mid-write can't leave a truncated record;
+    # the temp name is unique since identical uploads can finish together
+    record_path = _upload_record_path(digest)
+    tmp_path = f'{record_path}.{uuid.uuid4().hex}.tmp'
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump(response, f)
+        os.replace(tmp_path, record_path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _reuse_upload(digest, image_id):
+    """Reuse a previous upload of identical content under a new image_id.
+
+    Hard-links the earlier TIFF, preview and sidecars to image_id so
+    validation, preview generation and metadata extraction are skipped.
+    Returns the upload response, or None if there is nothing to reuse.
+    """
+    try:
+        with open(_upload_record_path(digest), 'r') as f:
+            response = json.load(f)
+    except (OSError, ValueError):
+        return None  # Missing, or a malformed record from an older run
+
+    prev_id = response.get('image_id') if isinstance(response, dict) else None
+    if not isinstance(prev_id, str):
+        return None
+    links = []
+    for folder, suffix, required in _UPLOAD_ARTIFACTS:
+        src = f'{folder}{os.sep}{prev_id}{suffix}'
+        if os.path.exists(src):
+            links.append((src, f'{folder}{os.sep}{image_id}{suffix}'))
+        elif required:
+            return None  # Already cleaned up
+
+    for src, dest in links:
+        if os.path.exists(dest):
+            os.remove(dest)
+        try:
+            os.link(src, dest)
+        except OSError:
+            shutil.copy2(src, dest)
+        os.utime(dest)  # Restart the cleanup clock
+
+    response['image_id'] = image_id
+    response['preview_url'] = f'/static/previews/{image_id}.png'
+    _record_upload(digest, response)
+    return response
+
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -45,80 +396,131 @@ def index():
 
 @app.route('/api/upload', methods=['POST'])
 def upload():
-    if 'file' not in request.files:
+    filename = _upload_filename()
+    if filename is None:
         return jsonify({'error': 'No file provided'}), 400
-
-    f = request.files['file']
-    if not f.filename:
+    if not filename:
         return jsonify({'error': 'No file selected'}), 400
 
-    ext = os.path.splitext(f.filename)[1].lower()
+    ext = _file_ext(filename)
     if ext not in ALLOWED_EXTENSIONS:
         return jsonify({'error': 'Only .tif/.tiff/.zip files are allowed'}), 400
 
     image_id = str(uuid.uuid4())
+    paths = ImagePaths.of(image_id)
+    tiff_path = paths.tiff
 
     # Handle ZIP files (USGS download packages)
     if ext == '.zip':
-        from processing.zip_handler import extract_usgs_package, get_package_info
-        import shutil
+        from processing.zip_handler import open_usgs_package, stream_usgs_package
 
-        # Save uploaded ZIP
-        zip_path = os.path.join(UPLOAD_FOLDER, f'{image_id}.zip')
-        f.save(zip_path)
+        # Save uploaded ZIP (the central directory is at the end, so it must be seekable)
+        zip_path = paths.zip
+        digest = _save_upload(zip_path)
 
-        # Extract to temporary directory
-        extract_dir = os.path.join(TEMP_EXTRACT_FOLDER, image_id)
-        os.makedirs(extract_dir, exist_ok=True)
-
-        extracted = extract_usgs_package(zip_path, extract_dir)
+        reused = _reuse_upload(digest, image_id)
+        if reused:
+            os.remove(zip_path)
+            return jsonify(reused)
 
-        if not extracted or 'tiff' not in extracted:
-            # Clean up
+        # Stream the TIFF and companion files straight to their final names,
+        # reusing the member listing parsed when the package was opened
+        try:
+            package = open_usgs_package(zip_path)
+            if package is None:
+                extracted = None
+            else:
+                with package:
+                    extracted = stream_usgs_package(zip_path, {
+                        'tiff': tiff_path,
+                        'worldfile': paths.worldfile,
+                        'footprint': paths.footprint,
+                    }, package)
+        except OSError as e:
+            return jsonify({'error': f'Failed to extract ZIP package: {e}'}), 500
+        finally:
             os.remove(zip_path)
-            if os.path.exists(extract_dir):
-                shutil.rmtree(extract_dir)
+
+        if not extracted:
             return jsonify({'error': 'No valid TIFF found in ZIP package'}), 400
 
-        # Move TIFF to upload folder
-        tiff_path = os.path.join(UPLOAD_FOLDER, f'{image_id}.tiff')
-        shutil.copy2(extracted['tiff'], tiff_path)
+    else:
+        # Handle regular TIFF upload
+        digest = _save_upload(tiff_path)
 
-        # Move companion files if they exist
-        if extracted.get('worldfile'):
-            worldfile_dest = os.path.join(UPLOAD_FOLDER, f'{image_id}.tfw')
-            shutil.copy2(extracted['worldfile'], worldfile_dest)
+        reused = _reuse_upload(digest, image_id)
+        if reused:
+            return jsonify(reused)
 
-        if extracted.get('footprint'):
-            footprint_dest = os.path.join(UPLOAD_FOLDER, f'{image_id}_footprint.geojson')
-            shutil.copy2(extracted['footprint'], footprint_dest)
+    # Validate, preview and extract metadata in the background; the client
+    # polls /api/upload/status/<image_id> for the result
+    _upload_jobs.submit(_process_upload, image_id, tiff_path, digest)
+    return jsonify({'image_id': image_id, 'status': 'processing'}), 202
 
-        # Clean up ZIP and extraction directory
-        os.remove(zip_path)
-        shutil.rmtree(extract_dir)
 
-    else:
-        # Handle regular TIFF upload
-        tiff_path = os.path.join(UPLOAD_FOLDER, f'{image_id}.tiff')
-        f.save(tiff_path)
+def _process_upload(image_id, tiff_path, digest):
+    """Validate, preview and extract metadata for an uploaded TIFF.
 
+    Runs on the upload job thread pool and hands the CPU-heavy steps to the
+    process pool. The outcome is written to {image_id}.result.json rather
+    than kept in memory, so any gunicorn worker can answer the status poll.
+    """
+    # Nobody reads this job's future, so every failure must end up in the
+    # result file (or remove the TIFF); otherwise the status poll would
+    # answer 'processing' forever
+    try:
+        try:
+            body, status = _run_upload_pipeline(image_id, tiff_path, digest)
+        except Exception as e:
+            app.logger.exception('[upload] Processing %s failed', image_id)
+            body, status = {'error': f'Upload processing failed: {e}'}, 500
+        _write_upload_result(image_id, body, status)
+    except Exception as e:
+        app.logger.exception('[upload] Recording the result for %s failed', image_id)
+        status = 500
+        try:
+            _write_upload_result(image_id, {'error': f'Upload processing failed: {e}'}, status)
+        except Exception:
+            pass  # With the TIFF gone the status poll reports 404 instead
+
+    if status != 200 and os.path.exists(tiff_path):
+        os.remove(tiff_path)
+
+
+def _write_upload_result(image_id, body, status):
+    """Store a background upload's response for upload_status()."""
+    # Write-then-rename so a status poll never sees a partial file
+    result_path = ImagePaths.of(image_id).result
+    with open(result_path + '.tmp', 'w') as f:
+        json.dump({'status': status, 'body': body}, f)
+    os.replace(result_path + '.tmp', result_path)
+
+
+def _run_upload_pipeline(image_id, tiff_path, digest):
+    """Return (response body, HTTP status) for an uploaded TIFF."""
     # Validate TIFF
-    valid, info = validate_tiff(tiff_path)
+    valid, info = _run_in_pool(validate_tiff, tiff_path)
     if not valid:
-        os.remove(tiff_path)
-        return jsonify({'error': info}), 400
+        return {'error': info}, 400
+
+    # Generate preview and extract metadata in parallel
+    preview_path = ImagePaths.of(image_id).preview
+    metadata_future = _submit_to_pool(extract_metadata, tiff_path)
 
-    # Generate preview
-    preview_path = os.path.join(PREVIEW_FOLDER, f'{image_id}.png')
     try:
-        preview_info = convert_to_preview(tiff_path, preview_path)
+        preview_info = _run_in_pool(convert_to_preview, tiff_path, preview_path)
     except Exception as e:
-        os.remove(tiff_path)
-        return jsonify({'error': f'Failed to generate preview: {str(e)}'}), 500
+        metadata_future.cancel()
+        return {'error': f'Failed to generate preview: {str(e)}'}, 500
 
-    # Extract metadata for potential auto-georeferencing
+    # Metadata is for potential auto-georeferencing
     try:
-        metadata = extract_metadata(tiff_path)
+        try:
+            metadata = metadata_future.result()
+        except BrokenProcessPool:
+            # Lost with the pool it was queued on; run it again on the new one
+            metadata = _run_in_pool(extract_metadata, tiff_path)
+        _save_cached_metadata(image_id, metadata)
     except Exception as e:
         # Metadata extraction is non-critical — proceed without it
         metadata = {
@@ -132,7 +534,7 @@ def upload():
             'source': None,
         }
 
-    return jsonify({
+    response = {
         'image_id': image_id,
         'preview_url': f'/static/previews/{image_id}.png',
         'original_width': preview_info['original_width'],
@@ -141,28 +543,45 @@ def upload():
         'preview_height': preview_info['preview_height'],
         'scale_factor': preview_info['scale_factor'],
         'metadata': metadata,
-    })
+    }
+    _record_upload(digest, response)
+    return response, 200
+
+
+@app.route('/api/upload/status/<image_id>')
+def upload_status(image_id):
+    """Report the result of a background upload job, or that it's still running."""
+    paths = ImagePaths.of(image_id)
+    try:
+        with open(paths.result, 'r') as f:
+            result = json.load(f)
+        return jsonify(result['body']), result['status']
+    except FileNotFoundError:
+        pass  # Still processing
+
+    if os.path.exists(paths.tiff):
+        return jsonify({'image_id': image_id, 'status': 'processing'}), 202
+    return jsonify({'error': 'Upload not found'}), 404
 
 
 @app.route('/api/overlay/upload', methods=['POST'])
 def upload_overlay():
-    if 'file' not in request.files:
+    filename = _upload_filename()
+    if filename is None:
         return jsonify({'error': 'No file provided'}), 400
-
-    f = request.files['file']
-    if not f.filename:
+    if not filename:
         return jsonify({'error': 'No file selected'}), 400
 
-    ext = os.path.splitext(f.filename)[1].lower()
+    ext = _file_ext(filename)
     if ext not in ALLOWED_OVERLAY_EXTENSIONS:
         allowed = ', '.join(sorted(ALLOWED_OVERLAY_EXTENSIONS))
         return jsonify({'error': f'Unsupported format. Allowed: {allowed}'}), 400
 
     overlay_id = str(uuid.uuid4())
     saved_path = os.path.join(OVERLAY_FOLDER, f'{overlay_id}{ext}')
-    f.save(saved_path)
+    _save_upload(saved_path)
 
-    result = convert_to_geojson(saved_path, f.filename)
+    result = _run_in_pool(convert_to_geojson, saved_path, filename)
 
     # Clean up the uploaded file — we only need the GeoJSON in the browser
     if os.path.exists(saved_path):
@@ -173,7 +592,7 @@ def upload_overlay():
 
     return jsonify({
         'overlay_id': overlay_id,
-        'name': os.path.splitext(f.filename)[0],
+        'name': os.path.splitext(filename)[0],
         'feature_count': result['feature_count'],
         'geojson': result['geojson'],
     })
@@ -194,18 +613,18 @@ def auto_georeference():
     if not image_id:
         return jsonify({'error': 'Missing image_id'}), 400
 
-    tiff_path = os.path.join(UPLOAD_FOLDER, f'{image_id}.tiff')
+    tiff_path = ImagePaths.of(image_id).tiff
     if not os.path.exists(tiff_path):
         return jsonify({'error': 'Image not found'}), 404
 
-    # Extract metadata
-    metadata = extract_metadata(tiff_path)
+    metadata = _get_metadata(image_id, tiff_path)
 
-    print(f'[auto-georeference] image_id={image_id}, '
-          f'metadata: has_georef={metadata.get("has_georeference")}, '
-          f'has_gps={metadata.get("has_gps")}, '
-          f'corners={metadata.get("corners") is not None}, '
-          f'source={metadata.get("source")}')
+    if app.logger.isEnabledFor(logging.DEBUG):
+        app.logger.debug(
+            '[auto-georeference] image_id=%s, metadata: has_georef=%s, '
+            'has_gps=%s, corners=%s, source=%s',
+            image_id, metadata.get('has_georeference'), metadata.get('has_gps'),
+            metadata.get('corners') is not None, metadata.get('source'))
 
     if not metadata.get('has_georeference') and not metadata.get('has_gps'):
         return jsonify({
@@ -216,23 +635,20 @@ def auto_georeference():
             )
         }), 400
 
-    # Get image dimensions
-    from PIL import Image
-    try:
-        with Image.open(tiff_path) as img:
-            width, height = img.size
-    except Exception as e:
-        return jsonify({'error': f'Could not read image dimensions: {e}'}), 500
+    # Image dimensions were read from the TIFF header by extract_metadata
+    width, height = metadata.get('width'), metadata.get('height')
+    if not width or not height:
+        return jsonify({'error': 'Could not read image dimensions'}), 500
 
     # Generate GCPs from metadata
     result = georeference_from_metadata(metadata, width, height)
 
     if result.get('error'):
-        print(f'[auto-georeference] Failed: {result["error"]}')
+        app.logger.debug('[auto-georeference] Failed: %s', result['error'])
         return jsonify({'error': result['error']}), 422
 
     gcps = result['gcps']
-    print(f'[auto-georeference] Generated {len(gcps)} GCPs from {result["method"]}')
+    app.logger.debug('[auto-georeference] Generated %d GCPs from %s', len(gcps), result['method'])
 
     return jsonify({
         'success': True,
@@ -266,12 +682,13 @@ def georeference():
     if len(gcps) < 5:
         return jsonify({'error': 'At least 5 GCPs are required'}), 400
 
-    tiff_path = os.path.join(UPLOAD_FOLDER, f'{image_id}.tiff')
+    paths = ImagePaths.of(image_id)
+    tiff_path = paths.tiff
     if not os.path.exists(tiff_path):
         return jsonify({'error': 'Image not found'}), 404
 
-    output_path = os.path.join(EXPORT_FOLDER, f'{image_id}_georef.tiff')
-    result = run_georeferencing(tiff_path, output_path, gcps)
+    output_path = paths.georef_tiff
+    result = _run_in_pool(run_georeferencing, tiff_path, output_path, gcps)
 
     if result.get('error'):
         return jsonify({'error': result['error']}), 500
@@ -285,39 +702,49 @@ def preview_overlay(image_id):
 
     Also returns the bounds as JSON if requested with ?bounds=1.
     """
-    georef_path = os.path.join(EXPORT_FOLDER, f'{image_id}_georef.tiff')
-    if not os.path.exists(georef_path):
+    paths = ImagePaths.of(image_id)
+    georef_path = paths.georef_tiff
+    try:
+        georef_mtime = os.stat(georef_path).st_mtime
+    except FileNotFoundError:
         return jsonify({'error': 'Georeferenced image not found'}), 404
 
     # Check if caller wants just the bounds
     if request.args.get('bounds'):
-        bounds_path = georef_path.replace('.tiff', '_bounds.json').replace('.tif', '_bounds.json')
-        if os.path.exists(bounds_path):
-            import json as json_mod
-            with open(bounds_path, 'r') as f:
-                bounds = json_mod.load(f)
-            return jsonify(bounds)
-        return jsonify({'error': 'Bounds not found'}), 404
-
-    # Convert georeferenced TIFF to JPEG for browser display
-    preview_jpg = os.path.join(EXPORT_FOLDER, f'{image_id}_preview_overlay.jpg')
-    if not os.path.exists(preview_jpg):
         try:
-            from PIL import Image as PILImage
-            import processing.config  # noqa: F401 — sets Image.MAX_IMAGE_PIXELS
-            img = PILImage.open(georef_path)
+            with open(paths.bounds_json, 'r') as f:
+                bounds = json.load(f)
+        except FileNotFoundError:
+            return jsonify({'error': 'Bounds not found'}), 404
+        return jsonify(bounds)
+
+    # Serve an already-transcoded preview (PNG for RGBA sources, JPEG otherwise)
+    # unless georeferencing has been re-run since it was made
+    preview_png = paths.overlay_png
+    preview_jpg = paths.overlay_jpg
+    for path, mimetype in ((preview_png, 'image/png'), (preview_jpg, 'image/jpeg')):
+        try:
+            if os.stat(path).st_mtime >= georef_mtime:
+                return _send_revalidated(path, mimetype=mimetype)
+        except FileNotFoundError:
+            pass
+
+    # Convert georeferenced TIFF for browser display — decoded once per georeference run
+    try:
+        from PIL import Image as PILImage
+        import processing.config  # noqa: F401 — sets Image.MAX_IMAGE_PIXELS
+        with PILImage.open(georef_path) as img:
             if img.mode == 'RGBA':
                 # Keep transparency by converting to PNG instead
-                preview_png = os.path.join(EXPORT_FOLDER, f'{image_id}_preview_overlay.png')
                 img.save(preview_png, 'PNG')
-                return send_file(preview_png, mimetype='image/png')
-            elif img.mode != 'RGB':
+                return _send_revalidated(preview_png, mimetype='image/png')
+            if img.mode != 'RGB':
                 img = img.convert('RGB')
             img.save(preview_jpg, 'JPEG', quality=85)
-        except Exception as e:
-            return jsonify({'error': f'Preview generation failed: {e}'}), 500
+    except Exception as e:
+        return jsonify({'error': f'Preview generation failed: {e}'}), 500
 
-    return send_file(preview_jpg, mimetype='image/jpeg')
+    return _send_revalidated(preview_jpg, mimetype='image/jpeg')
 
 
 @app.route('/api/export', methods=['POST'])
@@ -330,7 +757,8 @@ def export():
     if not image_id:
         return jsonify({'error': 'Missing image_id'}), 400
 
-    georef_path = os.path.join(EXPORT_FOLDER, f'{image_id}_georef.tiff')
+    paths = ImagePaths.of(image_id)
+    georef_path = paths.georef_tiff
     if not os.path.exists(georef_path):
         return jsonify({'error': 'Georeferenced image not found. Run georeferencing first.'}), 404
 
@@ -340,13 +768,11 @@ def export():
 
     if adjusted_bounds:
         # Write adjusted bounds to the sidecar JSON so exporter picks them up
-        import json as json_mod
-        bounds_path = georef_path.replace('.tiff', '_bounds.json').replace('.tif', '_bounds.json')
-        with open(bounds_path, 'w') as f:
-            json_mod.dump(adjusted_bounds, f)
+        with open(paths.bounds_json, 'w') as f:
+            json.dump(adjusted_bounds, f)
 
-    kmz_path = os.path.join(EXPORT_FOLDER, f'{image_id}.kmz')
-    result = generate_kmz(georef_path, kmz_path, rotation=rotation)
+    kmz_path = paths.kmz
+    result = _run_in_pool(generate_kmz, georef_path, kmz_path, rotation=rotation)
 
     if result.get('error'):
         return jsonify({'error': result['error']}), 500
@@ -362,7 +788,16 @@ def download(filename):
     filepath = os.path.join(EXPORT_FOLDER, filename)
     if not os.path.exists(filepath):
         return jsonify({'error': 'File not found'}), 404
-    return send_file(filepath, as_attachment=True, download_name=filename)
+
+    if EXPORT_ACCEL_PREFIX:
+        # nginx streams the file with sendfile(); the worker is freed immediately
+        return Response(headers={
+            'X-Accel-Redirect': f'{EXPORT_ACCEL_PREFIX.rstrip("/")}/{filename}',
+            'Content-Type': 'application/octet-stream',
+            'Content-Disposition': f'attachment; filename="{filename}"',
+        })
+
+    return _send_revalidated(filepath, as_attachment=True, download_name=filename)
 
 
 # --- File cleanup: delete files older than 1 hour ---
@@ -387,7 +822,8 @@ def _cleanup_old_files():
             except OSError:
                 pass
     if cleaned:
-        print(f'[cleanup] Removed {cleaned} file(s) older than {CLEANUP_MAX_AGE // 60} minutes')
+        app.logger.info('[cleanup] Removed %d file(s) older than %d minutes',
+                        cleaned, CLEANUP_MAX_AGE // 60)
 
 
 def _cleanup_loop():
@@ -397,7 +833,7 @@ def _cleanup_loop():
         try:
             _cleanup_old_files()
         except Exception as e:
-            print(f'[cleanup] Error: {e}')
+            app.logger.error('[cleanup] Error: %s', e)
 
 
 # Start cleanup thread (daemon so it dies with the main process)
@@ -407,4 +843,6 @@ _cleanup_thread.start()
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5051))
-    app.run(debug=True, host='0.0.0.0', port=port)
+    # Dev server only — production runs under gunicorn (see Procfile)
+    debug = os.environ.get('FLASK_DEBUG') == '1'
+    app.run(debug=debug, threaded=True, host='0.0.0.0', port=port)
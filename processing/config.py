@@ -1,7 +1,16 @@
 """Shared configuration for MapSync image processing."""
 
+import os
+
 from PIL import Image
 
 # Allow very large images (USGS aerials can be 100+ megapixels)
 MAX_IMAGE_PIXELS = 500_000_000
 Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Uploads and ZIP scratch space are rewritten on every upload; point these at
+# a tmpfs mount (e.g. /dev/shm/mapsync) to keep that I/O in RAM. Size the
+# mount for 2 x 500 MB (ZIP + extracted TIFF) per concurrent upload.
+UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER') or os.path.join(BASE_DIR, 'static', 'uploads')
+TEMP_EXTRACT_FOLDER = os.environ.get('TEMP_EXTRACT_FOLDER') or os.path.join(BASE_DIR, 'static', 'temp_extract')
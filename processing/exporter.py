@@ -7,7 +7,6 @@ JSON file saved by the georeferencer.
 
 import json
 import os
-import tempfile
 import zipfile
 
 import numpy as np
@@ -15,6 +14,18 @@ from PIL import Image
 
 import processing.config  # noqa: F401 — sets Image.MAX_IMAGE_PIXELS
 
+try:
+    import pyvips
+    _HAS_PYVIPS = True
+except (ImportError, OSError):  # OSError: pyvips installed but libvips missing
+    _HAS_PYVIPS = False
+
+# Content pixels satisfy 15 < mean(R, G, B) < 245; these are the same
+# thresholds on the integer channel sum, so no float grey image is built
+CONTENT_DARK_SUM = 3 * 15
+CONTENT_BRIGHT_SUM = 3 * 245
+CONTENT_SCAN_BAND_ROWS = 512  # rows per band when scanning for borders
+
 
 def generate_kmz(georef_tiff, kmz_path, rotation=0):
     """Generate a KMZ file from a georeferenced TIFF.
@@ -39,12 +50,36 @@ def generate_kmz(georef_tiff, kmz_path, rotation=0):
         if not bounds:
             return {'error': 'Could not find geographic bounds for the georeferenced image.'}
 
-        # Step 2: Convert TIFF to JPEG, removing borders
-        fd, jpeg_path = tempfile.mkstemp(suffix='.jpg')
-        os.close(fd)
+        # Build the KMZ under a temp name and swap it in only once complete,
+        # so a failed export never replaces the last good one
+        tmp_path = kmz_path + '.tmp'
+        try:
+            result = _write_kmz(georef_tiff, tmp_path, bounds, rotation)
+            if 'success' in result:
+                os.replace(tmp_path, kmz_path)
+            return result
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    except Exception as e:
+        return {'error': str(e)}
+
 
+def _write_kmz(georef_tiff, kmz_path, bounds, rotation):
+    """Write the KMZ archive (overlay.jpg + doc.kml) to kmz_path.
+
+    Returns:
+        Dict with 'success' and the (possibly crop-adjusted) 'bounds',
+        or 'error'.
+    """
+    # JPEG data is already compressed and doc.kml is under 1 KB, so
+    # nothing in the archive is worth deflating
+    with zipfile.ZipFile(kmz_path, 'w', zipfile.ZIP_STORED) as zf:
+        # Step 2: Encode TIFF as JPEG, removing borders, straight into the KMZ
         try:
-            crop_box = _tiff_to_jpeg(georef_tiff, jpeg_path)
+            with zf.open('overlay.jpg', 'w', force_zip64=True) as sink:
+                crop_box = _tiff_to_jpeg(georef_tiff, sink)
         except Exception as e:
             return {'error': f'JPEG conversion failed: {e}'}
 
@@ -55,21 +90,13 @@ def generate_kmz(georef_tiff, kmz_path, rotation=0):
         # Step 3: Build KML (with optional rotation)
         kml_content = build_kml(bounds, rotation=rotation)
 
-        # Step 4: Package into KMZ (ZIP containing doc.kml + overlay.jpg)
-        with zipfile.ZipFile(kmz_path, 'w', zipfile.ZIP_DEFLATED) as zf:
-            zf.writestr('doc.kml', kml_content)
-            zf.write(jpeg_path, 'overlay.jpg')
-
-        return {
-            'success': True,
-            'bounds': bounds,
-        }
+        # Step 4: Add doc.kml alongside overlay.jpg
+        zf.writestr('doc.kml', kml_content)
 
-    except Exception as e:
-        return {'error': str(e)}
-    finally:
-        if 'jpeg_path' in locals() and os.path.exists(jpeg_path):
-            os.remove(jpeg_path)
+    return {
+        'success': True,
+        'bounds': bounds,
+    }
 
 
 def _read_bounds(georef_tiff):
@@ -89,13 +116,19 @@ def _read_bounds(georef_tiff):
     return None
 
 
-def _tiff_to_jpeg(tiff_path, jpeg_path, quality=85):
+def _tiff_to_jpeg(tiff_path, sink, quality=85):
     """Convert a TIFF to JPEG, removing black borders and logo areas.
 
+    The JPEG is written to sink, a writable binary file object (e.g. a
+    ZIP entry opened for writing), so it never touches a temp file.
+
     Returns a crop_box tuple (left, top, right, bottom) as fractions
     of the original dimensions if cropping occurred, or None if no
     cropping was needed.
     """
+    if _HAS_PYVIPS:
+        return _tiff_to_jpeg_vips(tiff_path, sink, quality)
+
     img = Image.open(tiff_path)
     orig_w, orig_h = img.size
 
@@ -119,7 +152,53 @@ def _tiff_to_jpeg(tiff_path, jpeg_path, quality=85):
         # Convert to fractional box for bounds adjustment
         crop_box = (left / orig_w, top / orig_h, right / orig_w, bottom / orig_h)
 
-    img.save(jpeg_path, 'JPEG', quality=quality)
+    img.save(sink, 'JPEG', quality=quality)
+    return crop_box
+
+
+def _open_vips_rgb(tiff_path):
+    """Open a TIFF with libvips for a single sequential top-to-bottom read.
+
+    Alpha is flattened onto white and other modes are converted to 8-bit
+    sRGB, matching the Pillow path.
+    """
+    img = pyvips.Image.new_from_file(tiff_path, access='sequential')
+    if img.hasalpha():
+        img = img.flatten(background=[255, 255, 255])
+    img = img.colourspace('srgb')
+    if img.format != 'uchar':
+        img = img.cast('uchar')
+    return img
+
+
+def _tiff_to_jpeg_vips(tiff_path, sink, quality):
+    """libvips version of _tiff_to_jpeg.
+
+    Streams the TIFF strip by strip through libjpeg-turbo, so peak memory
+    is a few strips rather than several full-size copies of the image. The
+    border scan and the encode are two sequential reads of the file.
+    """
+    img = _open_vips_rgb(tiff_path)
+    w, h = img.width, img.height
+
+    # Per-column and per-row content pixel counts (mask is 0/255)
+    band_sum = img[0] + img[1] + img[2]  # uchar + uchar promotes to ushort
+    content = (band_sum > CONTENT_DARK_SUM) & (band_sum < CONTENT_BRIGHT_SUM)
+    col_sums, row_sums = content.project()
+    col_counts = np.frombuffer(col_sums.write_to_memory(), dtype=np.uint32) // 255
+    row_counts = np.frombuffer(row_sums.write_to_memory(), dtype=np.uint32) // 255
+
+    crop_box = _content_box(row_counts, col_counts, w, h)
+
+    img = _open_vips_rgb(tiff_path)
+    if crop_box is not None:
+        left, top, right, bottom = crop_box
+        img = img.crop(left, top, right - left, bottom - top)
+        crop_box = (left / w, top / h, right / w, bottom / h)
+
+    target = pyvips.TargetCustom()
+    target.on_write(sink.write)
+    img.jpegsave_target(target, Q=quality)
     return crop_box
 
 
@@ -130,26 +209,53 @@ def _find_content_bounds(img):
     (from scanning), and USGS logo bars. Returns (left, top, right, bottom)
     pixel coordinates, or None if no significant border detected.
     """
-    arr = np.array(img)
+    arr = np.asarray(img)
     h, w = arr.shape[:2]
 
-    # A pixel is "border" if it's very dark (black fill from warp)
-    # or very bright and uniform (white scanning border / logo bar)
-    grey = np.mean(arr, axis=2)
-
-    # Content pixels are neither near-black nor near-white
-    dark_thresh = 15
-    bright_thresh = 245
-    content_mask = (grey > dark_thresh) & (grey < bright_thresh)
+    # If all four outermost lines already have enough content, every side's
+    # first content row/col is the edge itself and there's nothing to crop.
+    # This probe reads 2*(w+h) pixels instead of the whole image.
+    if all(_has_enough_content(line) for line in (arr[0], arr[-1], arr[:, 0], arr[:, -1])):
+        return None
 
+    # A pixel is "border" if it's very dark (black fill from warp)
+    # or very bright and uniform (white scanning border / logo bar).
+    # Count content pixels per row and column in one pass over the image,
+    # a band of rows at a time so temporaries stay small
+    row_counts = np.empty(h, dtype=np.int64)
+    col_counts = np.zeros(w, dtype=np.int64)
+    for y0 in range(0, h, CONTENT_SCAN_BAND_ROWS):
+        # R + G + B via in-place uint16 adds; faster than a strided
+        # sum(axis=2) reduction and allocates only the one sum array
+        band = arr[y0:y0 + CONTENT_SCAN_BAND_ROWS]
+        band_sum = band[..., 0].astype(np.uint16)
+        band_sum += band[..., 1]
+        band_sum += band[..., 2]
+        content = (band_sum > CONTENT_DARK_SUM) & (band_sum < CONTENT_BRIGHT_SUM)
+        row_counts[y0:y0 + len(content)] = np.count_nonzero(content, axis=1)
+        col_counts += np.count_nonzero(content, axis=0)
+
+    return _content_box(row_counts, col_counts, w, h)
+
+
+def _has_enough_content(line, min_content_fraction=0.05):
+    """Check whether a single row or column of RGB pixels counts as content."""
+    line_sum = line.sum(axis=1, dtype=np.uint16)
+    content = (line_sum > CONTENT_DARK_SUM) & (line_sum < CONTENT_BRIGHT_SUM)
+    return np.count_nonzero(content) > min_content_fraction * len(line)
+
+
+def _content_box(row_counts, col_counts, w, h):
+    """Turn per-row/column content pixel counts into a crop box.
+
+    Returns (left, top, right, bottom) pixel coordinates, or None if no
+    significant border was found.
+    """
     # Find rows and columns that have enough content pixels
     min_content_fraction = 0.05  # At least 5% of the row/col must be content
 
-    row_content = np.mean(content_mask, axis=1)
-    col_content = np.mean(content_mask, axis=0)
-
-    content_rows = np.where(row_content > min_content_fraction)[0]
-    content_cols = np.where(col_content > min_content_fraction)[0]
+    content_rows = np.flatnonzero(row_counts > min_content_fraction * w)
+    content_cols = np.flatnonzero(col_counts > min_content_fraction * h)
 
     if len(content_rows) == 0 or len(content_cols) == 0:
         return None
@@ -194,14 +300,9 @@ def _adjust_bounds_for_crop(bounds, crop_frac):
     }
 
 
-def build_kml(bounds, rotation=0):
-    """Build KML XML for a ground overlay.
-
-    Args:
-        bounds: Dict with north, south, east, west.
-        rotation: Rotation angle in degrees (counter-clockwise).
-    """
-    return f'''<?xml version="1.0" encoding="UTF-8"?>
+# Numeric-only placeholders, so nothing needs XML escaping. 8 decimal
+# places of a degree is about 1 mm on the ground.
+_KML_TEMPLATE = b'''<?xml version="1.0" encoding="UTF-8"?>
 <kml xmlns="http://www.opengis.net/kml/2.2">
   <Document>
     <name>MapSync Export</name>
@@ -211,12 +312,28 @@ def build_kml(bounds, rotation=0):
         <href>overlay.jpg</href>
       </Icon>
       <LatLonBox>
-        <north>{bounds['north']}</north>
-        <south>{bounds['south']}</south>
-        <east>{bounds['east']}</east>
-        <west>{bounds['west']}</west>
-        <rotation>{rotation}</rotation>
+        <north>%.8f</north>
+        <south>%.8f</south>
+        <east>%.8f</east>
+        <west>%.8f</west>
+        <rotation>%.8g</rotation>
       </LatLonBox>
     </GroundOverlay>
   </Document>
 </kml>'''
+
+
+def build_kml(bounds, rotation=0):
+    """Build KML XML for a ground overlay.
+
+    Args:
+        bounds: Dict with north, south, east, west.
+        rotation: Rotation angle in degrees (counter-clockwise).
+
+    Returns:
+        UTF-8 encoded KML as bytes, ready for ZipFile.writestr.
+    """
+    return _KML_TEMPLATE % (
+        bounds['north'], bounds['south'], bounds['east'], bounds['west'],
+        float(rotation),
+    )
@@ -7,8 +7,8 @@ No external command-line dependencies required.
 """
 
 import json
+import logging
 import math
-import os
 
 import cv2
 import numpy as np
@@ -22,6 +22,8 @@ try:
 except ImportError:
     _HAS_SCIPY = False
 
+log = logging.getLogger(__name__)
+
 TPS_MIN_GCPS = 10  # use TPS when this many GCPs are available
 
 
@@ -77,10 +79,8 @@ def _run_affine(input_tiff, output_tiff, gcps, orig_w, orig_h):
 
     residuals = _compute_residuals_affine(affine, gcps)
 
-    print(f'[georeferencer] Affine georeferencing complete: '
-          f'RMS={residuals["rms"]:.1f}m, '
-          f'bounds=N{bounds["north"]:.4f} S{bounds["south"]:.4f} '
-          f'E{bounds["east"]:.4f} W{bounds["west"]:.4f}')
+    log.info('Affine georeferencing complete: RMS=%.1fm, bounds=N%.4f S%.4f E%.4f W%.4f',
+             residuals['rms'], bounds['north'], bounds['south'], bounds['east'], bounds['west'])
 
     return {
         'success': True,
@@ -93,25 +93,19 @@ def _run_affine(input_tiff, output_tiff, gcps, orig_w, orig_h):
 
 def _compute_affine(gcps):
     """Fit a 6-parameter affine transform: pixel (x,y) -> geographic (lon,lat)."""
-    n = len(gcps)
-    A = np.zeros((n, 3))
-    lon_vec = np.zeros(n)
-    lat_vec = np.zeros(n)
-
-    for i, gcp in enumerate(gcps):
-        A[i] = [1.0, gcp['pixel_x'], gcp['pixel_y']]
-        lon_vec[i] = gcp['lon']
-        lat_vec[i] = gcp['lat']
+    pts = np.array([(g['pixel_x'], g['pixel_y'], g['lon'], g['lat']) for g in gcps],
+                   dtype=np.float64)
+    A = np.column_stack([np.ones(len(pts)), pts[:, 0], pts[:, 1]])
 
+    # Solve for lon and lat in one call, one right-hand-side column each
     try:
-        lon_coeffs, _, _, _ = np.linalg.lstsq(A, lon_vec, rcond=None)
-        lat_coeffs, _, _, _ = np.linalg.lstsq(A, lat_vec, rcond=None)
+        coeffs, _, _, _ = np.linalg.lstsq(A, pts[:, 2:4], rcond=None)
     except np.linalg.LinAlgError:
         return None
 
     return {
-        'lon_coeffs': lon_coeffs.tolist(),
-        'lat_coeffs': lat_coeffs.tolist(),
+        'lon_coeffs': coeffs[:, 0].tolist(),
+        'lat_coeffs': coeffs[:, 1].tolist(),
     }
 
 
@@ -144,7 +138,7 @@ def _warp_image_affine(input_tiff, output_tiff, affine, bounds):
         except Exception:
             src_img = src_img.convert('L').convert('RGB')
 
-    src_arr = np.array(src_img)
+    src_arr = np.asarray(src_img)  # cv2.remap only reads it; skip the extra copy
 
     a1 = affine['lon_coeffs'][1]
     b1 = affine['lat_coeffs'][1]
@@ -169,36 +163,28 @@ def _warp_image_affine(input_tiff, output_tiff, affine, bounds):
         src_img.save(output_tiff, 'TIFF')
         return
 
-    ox_grid, oy_grid = np.meshgrid(np.arange(out_w), np.arange(out_h))
-    lon_grid = bounds['west'] + ox_grid * (lon_span / out_w)
-    lat_grid = bounds['north'] - oy_grid * (lat_span / out_h)
+    # Output pixel -> (lon, lat) -> source pixel is affine end to end, so hand
+    # OpenCV the composed 2x3 matrix instead of building full-size remap grids:
+    # src = M_inv @ diag(sx, -sy) @ (ox, oy) + M_inv @ (west - a0, north - b0)
+    out_to_src = np.empty((2, 3))
+    out_to_src[:, :2] = M_inv @ np.diag([lon_span / out_w, -lat_span / out_h])
+    out_to_src[:, 2] = M_inv @ np.array([bounds['west'] - a0, bounds['north'] - b0])
 
-    dlon = lon_grid - a0
-    dlat = lat_grid - b0
-    map_x = (M_inv[0, 0] * dlon + M_inv[0, 1] * dlat).astype(np.float32)
-    map_y = (M_inv[1, 0] * dlon + M_inv[1, 1] * dlat).astype(np.float32)
+    warped = cv2.warpAffine(src_arr, out_to_src, (out_w, out_h),
+                            flags=cv2.INTER_LINEAR | cv2.WARP_INVERSE_MAP,
+                            borderMode=cv2.BORDER_CONSTANT,
+                            borderValue=(0, 0, 0))
 
-    warped = cv2.remap(src_arr, map_x, map_y,
-                       interpolation=cv2.INTER_LINEAR,
-                       borderMode=cv2.BORDER_CONSTANT,
-                       borderValue=(0, 0, 0))
-
-    Image.fromarray(warped).save(output_tiff, 'TIFF', compression='tiff_lzw')
+    _save_warped(output_tiff, warped)
 
 
 def _compute_residuals_affine(affine, gcps):
-    per_point = []
-    sum_sq = 0
-    for gcp in gcps:
-        pred_lon, pred_lat = _pixel_to_geo_affine(gcp['pixel_x'], gcp['pixel_y'], affine)
-        error_m = haversine(gcp['lat'], gcp['lon'], pred_lat, pred_lon)
-        per_point.append({
-            'gcp_id': gcp.get('id', len(per_point) + 1),
-            'error_m': round(error_m, 1),
-        })
-        sum_sq += error_m ** 2
-    rms = math.sqrt(sum_sq / len(gcps)) if gcps else 0
-    return {'per_point': per_point, 'rms': round(rms, 1)}
+    a0, a1, a2 = affine['lon_coeffs']
+    b0, b1, b2 = affine['lat_coeffs']
+    px_coords = np.array([[g['pixel_x'], g['pixel_y']] for g in gcps], dtype=np.float64)
+    pred_lons = a0 + a1 * px_coords[:, 0] + a2 * px_coords[:, 1]
+    pred_lats = b0 + b1 * px_coords[:, 0] + b2 * px_coords[:, 1]
+    return _residuals_from_predictions(gcps, pred_lons, pred_lats)
 
 
 # ─── TPS (thin-plate spline) pipeline ──────────────────────────────
@@ -248,10 +234,9 @@ def _run_tps(input_tiff, output_tiff, gcps, orig_w, orig_h):
 
     residuals = _compute_residuals_tps(tps, gcps)
 
-    print(f'[georeferencer] TPS georeferencing complete ({len(gcps)} GCPs): '
-          f'RMS={residuals["rms"]:.1f}m, '
-          f'bounds=N{bounds["north"]:.4f} S{bounds["south"]:.4f} '
-          f'E{bounds["east"]:.4f} W{bounds["west"]:.4f}')
+    log.info('TPS georeferencing complete (%d GCPs): RMS=%.1fm, bounds=N%.4f S%.4f E%.4f W%.4f',
+             len(gcps), residuals['rms'],
+             bounds['north'], bounds['south'], bounds['east'], bounds['west'])
 
     return {
         'success': True,
@@ -270,7 +255,7 @@ def _warp_image_tps(input_tiff, output_tiff, tps, bounds, px_size_deg):
         except Exception:
             src_img = src_img.convert('L').convert('RGB')
 
-    src_arr = np.array(src_img)
+    src_arr = np.asarray(src_img)  # cv2.remap only reads it; skip the extra copy
 
     lon_span = bounds['east'] - bounds['west']
     lat_span = bounds['north'] - bounds['south']
@@ -286,34 +271,45 @@ def _warp_image_tps(input_tiff, output_tiff, tps, bounds, px_size_deg):
     src_x = tps['inv_px'](geo_flat).reshape(out_h, out_w).astype(np.float32)
     src_y = tps['inv_py'](geo_flat).reshape(out_h, out_w).astype(np.float32)
 
-    warped = cv2.remap(src_arr, src_x, src_y,
+    # Fixed-point maps take OpenCV's faster SIMD remap kernel and use 6
+    # instead of 8 bytes per output pixel
+    map1, map2 = cv2.convertMaps(src_x, src_y, cv2.CV_16SC2)
+    del src_x, src_y
+
+    warped = cv2.remap(src_arr, map1, map2,
                        interpolation=cv2.INTER_LINEAR,
                        borderMode=cv2.BORDER_CONSTANT,
                        borderValue=(0, 0, 0))
 
-    Image.fromarray(warped).save(output_tiff, 'TIFF', compression='tiff_lzw')
+    _save_warped(output_tiff, warped)
 
 
 def _compute_residuals_tps(tps, gcps):
-    per_point = []
-    sum_sq = 0
     px_coords = np.array([[g['pixel_x'], g['pixel_y']] for g in gcps])
     pred_lons = tps['fwd_lon'](px_coords)
     pred_lats = tps['fwd_lat'](px_coords)
+    return _residuals_from_predictions(gcps, pred_lons, pred_lats)
 
-    for i, gcp in enumerate(gcps):
-        error_m = haversine(gcp['lat'], gcp['lon'], float(pred_lats[i]), float(pred_lons[i]))
-        per_point.append({
-            'gcp_id': gcp.get('id', i + 1),
-            'error_m': round(error_m, 1),
-        })
-        sum_sq += error_m ** 2
 
-    rms = math.sqrt(sum_sq / len(gcps)) if gcps else 0
-    return {'per_point': per_point, 'rms': round(rms, 1)}
+# ─── Shared helpers ─────────────────────────────────────────────────
 
+def _save_warped(output_tiff, warped):
+    """Write a warped RGB(A) array as an uncompressed TIFF.
+
+    Goes through cv2.imwrite rather than Image.fromarray, which would copy
+    the whole output into Pillow's 4-bytes-per-pixel layout first. The
+    channel swap OpenCV expects is done in place on the array.
+
+    The file is only an intermediate read back by the preview and KMZ
+    export, and LZW barely shrinks photographic content, so it is stored
+    uncompressed: no single-threaded encode here, no decode on every read.
+    Output is capped at 8000x8000 (256 MB RGBA), well inside classic TIFF.
+    """
+    code = cv2.COLOR_RGBA2BGRA if warped.shape[2] == 4 else cv2.COLOR_RGB2BGR
+    cv2.cvtColor(warped, code, dst=warped)
+    if not cv2.imwrite(output_tiff, warped, [cv2.IMWRITE_TIFF_COMPRESSION, 1]):  # 1 = none
+        raise OSError(f'Could not write {output_tiff}')
 
-# ─── Shared helpers ─────────────────────────────────────────────────
 
 def _save_bounds(output_tiff, bounds):
     bounds_path = output_tiff.replace('.tiff', '_bounds.json').replace('.tif', '_bounds.json')
@@ -321,13 +317,32 @@ def _save_bounds(output_tiff, bounds):
         json.dump(bounds, f)
 
 
+def _residuals_from_predictions(gcps, pred_lons, pred_lats):
+    """Per-GCP and RMS error in meters between GCP locations and predicted ones."""
+    if not gcps:
+        return {'per_point': [], 'rms': 0}
+    lats = np.array([g['lat'] for g in gcps], dtype=np.float64)
+    lons = np.array([g['lon'] for g in gcps], dtype=np.float64)
+    errors_m = haversine(lats, lons, pred_lats, pred_lons)
+
+    per_point = [
+        {'gcp_id': gcp.get('id', i + 1), 'error_m': round(float(error_m), 1)}
+        for i, (gcp, error_m) in enumerate(zip(gcps, errors_m))
+    ]
+    rms = math.sqrt(float(np.mean(errors_m ** 2)))
+    return {'per_point': per_point, 'rms': round(rms, 1)}
+
+
 def haversine(lat1, lon1, lat2, lon2):
-    """Compute the great-circle distance between two points in meters."""
+    """Compute the great-circle distance between two points in meters.
+
+    Accepts scalars or numpy arrays (elementwise).
+    """
     R = 6371000
-    phi1 = math.radians(lat1)
-    phi2 = math.radians(lat2)
-    dphi = math.radians(lat2 - lat1)
-    dlam = math.radians(lon2 - lon1)
-    a = (math.sin(dphi / 2) ** 2
-         + math.cos(phi1) * math.cos(phi2) * math.sin(dlam / 2) ** 2)
-    return R * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+    phi1 = np.radians(lat1)
+    phi2 = np.radians(lat2)
+    dphi = np.radians(np.subtract(lat2, lat1))
+    dlam = np.radians(np.subtract(lon2, lon1))
+    a = (np.sin(dphi / 2) ** 2
+         + np.cos(phi1) * np.cos(phi2) * np.sin(dlam / 2) ** 2)
+    return R * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
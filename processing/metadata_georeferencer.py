@@ -1,7 +1,9 @@
 """Metadata-based georeferencing using embedded location data."""
 
 import math
-from PIL import Image
+
+# At the equator: 1 degree latitude ≈ 111,111 meters
+METERS_PER_DEGREE_LAT = 111111.0
 
 
 def georeference_from_metadata(metadata, image_width, image_height):
@@ -89,30 +91,7 @@ def _generate_gcps_from_center_and_gsd(center_lat, center_lon, gsd, width, heigh
         gsd: Ground sample distance in meters per pixel.
         width, height: Image dimensions in pixels.
     """
-    # Calculate the geographic extent covered by the image
-    # Half dimensions in pixels
-    half_width_px = width / 2
-    half_height_px = height / 2
-
-    # Distance from center to edge in meters
-    half_width_m = half_width_px * gsd
-    half_height_m = half_height_px * gsd
-
-    # Convert meters to degrees (approximate)
-    # At the equator: 1 degree latitude ≈ 111,111 meters
-    # Longitude varies by latitude: 1 degree longitude ≈ 111,111 * cos(latitude) meters
-    meters_per_degree_lat = 111111
-    meters_per_degree_lon = 111111 * math.cos(math.radians(center_lat))
-
-    lat_span = half_height_m / meters_per_degree_lat
-    lon_span = half_width_m / meters_per_degree_lon
-
-    # Calculate corner coordinates
-    # Note: In image coordinates, Y increases downward, but latitude increases upward
-    north = center_lat + lat_span
-    south = center_lat - lat_span
-    east = center_lon + lon_span
-    west = center_lon - lon_span
+    north, south, east, west = gps_to_bounds(center_lat, center_lon, gsd, width, height)
 
     corners = {
         'north': north,
@@ -124,6 +103,32 @@ def _generate_gcps_from_center_and_gsd(center_lat, center_lon, gsd, width, heigh
     return _generate_corner_gcps(corners, width, height, method)
 
 
+def gps_to_bounds(center_lat, center_lon, gsd, width, height):
+    """Compute the geographic extent of an image from its center and GSD.
+
+    Pure float arithmetic with no dict building, so batch callers can use it
+    directly on many images.
+
+    Returns:
+        Tuple (north, south, east, west) in degrees.
+    """
+    # Distance from center to edge in meters
+    half_width_m = width / 2 * gsd
+    half_height_m = height / 2 * gsd
+
+    # Convert meters to degrees (approximate)
+    lat_span = half_height_m / METERS_PER_DEGREE_LAT
+    lon_span = half_width_m / _meters_per_degree_lon(center_lat)
+
+    # Note: In image coordinates, Y increases downward, but latitude increases upward
+    return (
+        center_lat + lat_span,
+        center_lat - lat_span,
+        center_lon + lon_span,
+        center_lon - lon_span,
+    )
+
+
 def estimate_gsd_from_bounds(bounds, width, height):
     """Estimate ground sample distance from user-provided bounding box.
 
@@ -141,14 +146,16 @@ def estimate_gsd_from_bounds(bounds, width, height):
     lon_span = bounds['east'] - bounds['west']
 
     # Convert to meters
-    meters_per_degree_lat = 111111
-    meters_per_degree_lon = 111111 * math.cos(math.radians(center_lat))
-
-    height_m = lat_span * meters_per_degree_lat
-    width_m = lon_span * meters_per_degree_lon
+    height_m = lat_span * METERS_PER_DEGREE_LAT
+    width_m = lon_span * _meters_per_degree_lon(center_lat)
 
     # Average GSD from both dimensions
     gsd_y = height_m / height
     gsd_x = width_m / width
 
     return (gsd_x + gsd_y) / 2
+
+
+def _meters_per_degree_lon(lat):
+    """Approximate meters per degree of longitude: 111,111 * cos(latitude)."""
+    return METERS_PER_DEGREE_LAT * math.cos(math.radians(lat))
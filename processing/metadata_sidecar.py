@@ -11,9 +11,23 @@ Common metadata file formats:
 
 import os
 import re
-import xml.etree.ElementTree as ET
 from typing import Optional, Dict
 
+# Text metadata patterns, compiled once at import
+_CORNER_PATTERNS = {
+    key: re.compile(pattern, re.IGNORECASE)
+    for key, pattern in {
+        'north': r'(?:NORTH|NW_CORNER_LAT|NORTHEAST.*LAT)[:\s]+([+-]?\d+\.?\d*)',
+        'south': r'(?:SOUTH|SW_CORNER_LAT|SOUTHWEST.*LAT)[:\s]+([+-]?\d+\.?\d*)',
+        'east': r'(?:EAST|NE_CORNER_LON|NORTHEAST.*LON)[:\s]+([+-]?\d+\.?\d*)',
+        'west': r'(?:WEST|NW_CORNER_LON|NORTHWEST.*LON)[:\s]+([+-]?\d+\.?\d*)',
+    }.items()
+}
+_CENTER_PATTERN = re.compile(
+    r'(?:SCENE.*CENTER|CENTER)[:\s]+([+-]?\d+\.?\d*)[,\s]+([+-]?\d+\.?\d*)',
+    re.IGNORECASE
+)
+
 
 def find_metadata_sidecar(tiff_path: str) -> Optional[str]:
     """Find metadata sidecar file for a TIFF.
@@ -71,86 +85,91 @@ def _parse_xml_metadata(xml_path: str) -> Optional[Dict]:
 
     USGS FGDC metadata contains:
     - <bounding><westbc>, <eastbc>, <northbc>, <southbc>
+
+    Streams the file with iterparse instead of building the whole tree,
+    and stops as soon as the bounding coordinates have been read.
     """
+    import xml.etree.ElementTree as ET  # only XML sidecars need the parser
+
+    bounding_keys = {'westbc': 'west', 'eastbc': 'east',
+                     'northbc': 'north', 'southbc': 'south'}
     try:
-        tree = ET.parse(xml_path)
-        root = tree.getroot()
-
-        # Look for bounding coordinates (FGDC standard)
-        # Try multiple path variations
-        bounding = root.find('.//bounding')
-
-        # If not found, try direct search for coordinate elements
-        if bounding is None:
-            west_elem = root.find('.//westbc')
-            east_elem = root.find('.//eastbc')
-            north_elem = root.find('.//northbc')
-            south_elem = root.find('.//southbc')
-        else:
-            west_elem = bounding.find('westbc')
-            east_elem = bounding.find('eastbc')
-            north_elem = bounding.find('northbc')
-            south_elem = bounding.find('southbc')
-
-            if all([west_elem is not None, east_elem is not None,
-                    north_elem is not None, south_elem is not None]):
-                west = float(west_elem.text)
-                east = float(east_elem.text)
-                north = float(north_elem.text)
-                south = float(south_elem.text)
-
-                center_lat = (north + south) / 2
-                center_lon = (east + west) / 2
-
-                return {
-                    'corners': {
-                        'north': north,
-                        'south': south,
-                        'east': east,
-                        'west': west,
-                    },
-                    'center_lat': center_lat,
-                    'center_lon': center_lon,
-                    'source': 'FGDC XML Metadata',
-                }
-
-        # Alternative: Look for corner coordinates in different format
-        # Some metadata uses <G-Polygon> with corner points
-        gpolygon = root.find('.//G-Polygon')
-        if gpolygon is not None:
-            coords = []
-            for point in gpolygon.findall('.//G-Ring_Point'):
-                lat_elem = point.find('Latitude')
-                lon_elem = point.find('Longitude')
-                if lat_elem is not None and lon_elem is not None:
-                    coords.append({
-                        'lat': float(lat_elem.text),
-                        'lon': float(lon_elem.text)
-                    })
-
-            if len(coords) >= 4:
-                lats = [c['lat'] for c in coords]
-                lons = [c['lon'] for c in coords]
-
-                north = max(lats)
-                south = min(lats)
-                east = max(lons)
-                west = min(lons)
-
-                center_lat = (north + south) / 2
-                center_lon = (east + west) / 2
-
-                return {
-                    'corners': {
-                        'north': north,
-                        'south': south,
-                        'east': east,
-                        'west': west,
-                    },
-                    'center_lat': center_lat,
-                    'center_lon': center_lon,
-                    'source': 'XML G-Polygon',
-                }
+        path = []             # tags of the currently open elements
+        bounds = {}
+        bounding_seen = False  # only the first <bounding> counts
+        in_gpolygon = False
+        gpolygon_seen = False  # ...and only the first <G-Polygon>
+        point = {}
+        coords = []
+
+        for event, elem in ET.iterparse(xml_path, events=('start', 'end')):
+            tag = elem.tag
+            if event == 'start':
+                path.append(tag)
+                if tag == 'G-Polygon' and not gpolygon_seen:
+                    in_gpolygon = True
+                continue
+
+            path.pop()
+            parent = path[-1] if path else None
+
+            if tag in bounding_keys and parent == 'bounding' and not bounding_seen:
+                bounds[bounding_keys[tag]] = float(elem.text)
+            elif tag == 'bounding' and not bounding_seen:
+                bounding_seen = True
+                if len(bounds) == 4:
+                    center_lat = (bounds['north'] + bounds['south']) / 2
+                    center_lon = (bounds['east'] + bounds['west']) / 2
+
+                    return {
+                        'corners': {
+                            'north': bounds['north'],
+                            'south': bounds['south'],
+                            'east': bounds['east'],
+                            'west': bounds['west'],
+                        },
+                        'center_lat': center_lat,
+                        'center_lon': center_lon,
+                        'source': 'FGDC XML Metadata',
+                    }
+            elif in_gpolygon:
+                # Alternative: some metadata uses <G-Polygon> with corner points
+                if tag in ('Latitude', 'Longitude') and parent == 'G-Ring_Point':
+                    point[tag] = float(elem.text)
+                elif tag == 'G-Ring_Point':
+                    if len(point) == 2:
+                        coords.append({'lat': point['Latitude'], 'lon': point['Longitude']})
+                    point = {}
+                elif tag == 'G-Polygon':
+                    in_gpolygon = False
+                    gpolygon_seen = True
+
+            # Everything needed from this element has been read
+            elem.clear()
+
+        if len(coords) >= 4:
+            lats = [c['lat'] for c in coords]
+            lons = [c['lon'] for c in coords]
+
+            north = max(lats)
+            south = min(lats)
+            east = max(lons)
+            west = min(lons)
+
+            center_lat = (north + south) / 2
+            center_lon = (east + west) / 2
+
+            return {
+                'corners': {
+                    'north': north,
+                    'south': south,
+                    'east': east,
+                    'west': west,
+                },
+                'center_lat': center_lat,
+                'center_lon': center_lon,
+                'source': 'XML G-Polygon',
+            }
 
         return None
 
@@ -171,16 +190,9 @@ def _parse_text_metadata(txt_path: str) -> Optional[Dict]:
             content = f.read()
 
         # Common patterns for corner coordinates
-        patterns = {
-            'north': r'(?:NORTH|NW_CORNER_LAT|NORTHEAST.*LAT)[:\s]+([+-]?\d+\.?\d*)',
-            'south': r'(?:SOUTH|SW_CORNER_LAT|SOUTHWEST.*LAT)[:\s]+([+-]?\d+\.?\d*)',
-            'east': r'(?:EAST|NE_CORNER_LON|NORTHEAST.*LON)[:\s]+([+-]?\d+\.?\d*)',
-            'west': r'(?:WEST|NW_CORNER_LON|NORTHWEST.*LON)[:\s]+([+-]?\d+\.?\d*)',
-        }
-
         coords = {}
-        for key, pattern in patterns.items():
-            match = re.search(pattern, content, re.IGNORECASE)
+        for key, pattern in _CORNER_PATTERNS.items():
+            match = pattern.search(content)
             if match:
                 coords[key] = float(match.group(1))
 
@@ -201,11 +213,7 @@ def _parse_text_metadata(txt_path: str) -> Optional[Dict]:
             }
 
         # Try alternative pattern: Scene Center
-        center_match = re.search(
-            r'(?:SCENE.*CENTER|CENTER)[:\s]+([+-]?\d+\.?\d*)[,\s]+([+-]?\d+\.?\d*)',
-            content,
-            re.IGNORECASE
-        )
+        center_match = _CENTER_PATTERN.search(content)
 
         if center_match:
             center_lat = float(center_match.group(1))
@@ -1,21 +1,48 @@
-import os
 import subprocess
 import json
 from PIL import Image
-from PIL.ExifTags import TAGS, GPSTAGS
 
 import processing.config  # noqa: F401 — sets Image.MAX_IMAGE_PIXELS
 
+try:
+    import pyvips
+    _HAS_PYVIPS = True
+except (ImportError, OSError):  # OSError: pyvips installed but libvips missing
+    _HAS_PYVIPS = False
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+try:
+    from osgeo import gdal
+    gdal.UseExceptions()
+    _HAS_GDAL = True
+except ImportError:
+    _HAS_GDAL = False
+
 PREVIEW_MAX_DIM = 4096
 
+# EXIF tag IDs (see PIL.ExifTags); looked up directly instead of by name
+EXIF_IFD = 0x8769
+GPS_IFD = 0x8825
+GPS_LATITUDE_REF, GPS_LATITUDE = 1, 2
+GPS_LONGITUDE_REF, GPS_LONGITUDE = 3, 4
+GPS_ALTITUDE = 6
+EXIF_FOCAL_LENGTH = 37386
+
 
 def validate_tiff(filepath):
-    """Validate that the file is a readable TIFF image."""
+    """Validate that the file is a readable TIFF image.
+
+    Only the header is parsed; pixel data is decoded later by the preview.
+    """
     try:
         with Image.open(filepath) as img:
-            img.verify()
-        # Re-open after verify (verify can leave the file in a bad state)
-        with Image.open(filepath) as img:
+            if img.format != 'TIFF':
+                return False, 'File is not a TIFF image'
             w, h = img.size
             if w < 10 or h < 10:
                 return False, 'Image is too small'
@@ -29,9 +56,17 @@ def convert_to_preview(tiff_path, preview_path, max_dim=PREVIEW_MAX_DIM):
 
     Returns dict with original and preview dimensions plus scale factor.
     """
+    if _HAS_PYVIPS:
+        return _convert_to_preview_vips(tiff_path, preview_path, max_dim)
+
     with Image.open(tiff_path) as img:
         orig_w, orig_h = img.size
 
+        # 16-bit greyscale: keep the top byte, as the vips path does;
+        # convert() alone clips, turning the preview nearly white
+        if img.mode.startswith('I;16'):
+            img = img.convert('I').point(lambda v: v * (1 / 256)).convert('L')
+
         # Convert to RGB if necessary (some TIFFs are 16-bit or have extra channels)
         if img.mode not in ('RGB', 'RGBA'):
             try:
@@ -48,7 +83,9 @@ def convert_to_preview(tiff_path, preview_path, max_dim=PREVIEW_MAX_DIM):
             else:
                 new_h = max_dim
                 new_w = int(orig_w * (max_dim / orig_h))
-            img = img.resize((new_w, new_h), Image.LANCZOS)
+            # reducing_gap: box-reduce by an integer factor first, then
+            # LANCZOS only over the last <3x, instead of over every source pixel
+            img = img.resize((new_w, new_h), Image.LANCZOS, reducing_gap=3.0)
         else:
             new_w, new_h = orig_w, orig_h
 
@@ -65,6 +102,43 @@ def convert_to_preview(tiff_path, preview_path, max_dim=PREVIEW_MAX_DIM):
     }
 
 
+def _convert_to_preview_vips(tiff_path, preview_path, max_dim):
+    """libvips version of convert_to_preview.
+
+    thumbnail() shrinks while loading: it reads the nearest pyramid level
+    when the TIFF has one, and otherwise streams the full-resolution image
+    through the shrink without ever holding it in memory.
+    """
+    orig = pyvips.Image.new_from_file(tiff_path)  # header only
+    orig_w, orig_h = orig.width, orig.height
+
+    img = pyvips.Image.thumbnail(tiff_path, max_dim, height=max_dim, size='down',
+                                 no_rotate=True)
+    if img.bands not in (3, 4) or img.interpretation != 'srgb':
+        try:
+            img = img.colourspace('srgb')
+        except pyvips.Error:
+            # Exotic interpretations (e.g. multiband) have no route to sRGB;
+            # go via greyscale, as the Pillow path's convert('L') fallback does
+            grey = 'grey16' if img.format == 'ushort' else 'b-w'
+            img = img.extract_band(0).copy(interpretation=grey).colourspace('srgb')
+    # Scale down to 8 bits; a plain cast clips, turning 16-bit data nearly white
+    if img.format == 'ushort':
+        img = (img >> 8).cast('uchar')
+    elif img.format != 'uchar':
+        img = img.scaleimage()
+    img.pngsave(preview_path)
+
+    new_w, new_h = img.width, img.height
+    return {
+        'original_width': orig_w,
+        'original_height': orig_h,
+        'preview_width': new_w,
+        'preview_height': new_h,
+        'scale_factor': orig_w / new_w,
+    }
+
+
 def extract_metadata(tiff_path):
     """Extract georeferencing metadata from TIFF file.
 
@@ -82,7 +156,15 @@ def extract_metadata(tiff_path):
     - 'corners': dict with north/south/east/west (if available)
     - 'gsd': float (ground sample distance in meters, if available)
     - 'source': str describing metadata source
+    - 'width', 'height': int pixel dimensions (None if unreadable)
     """
+    # PIL only parses the TIFF header on open, so this never decodes pixels
+    try:
+        with Image.open(tiff_path) as img:
+            width, height = img.size
+    except Exception:
+        width, height = None, None
+
     metadata = {
         'has_georeference': False,
         'has_gps': False,
@@ -92,6 +174,8 @@ def extract_metadata(tiff_path):
         'corners': None,
         'gsd': None,
         'source': None,
+        'width': width,
+        'height': height,
     }
 
     # Check for GDAL geotransform first (already georeferenced)
@@ -104,14 +188,8 @@ def extract_metadata(tiff_path):
 
     # Try world file (.tfw) - USGS download package
     from processing.worldfile_parser import try_extract_from_worldfile
-    # Get image dimensions for world file parsing
-    try:
-        with Image.open(tiff_path) as img:
-            width, height = img.size
-    except Exception:
-        width, height = 4000, 4000  # fallback dimensions
-
-    worldfile_meta = try_extract_from_worldfile(tiff_path, width, height)
+    worldfile_meta = try_extract_from_worldfile(
+        tiff_path, width or 4000, height or 4000)  # fallback dimensions
     if worldfile_meta:
         metadata.update(worldfile_meta)
         metadata['has_georeference'] = True
@@ -138,27 +216,66 @@ def extract_metadata(tiff_path):
     return metadata
 
 
+def _read_gdal_corners(tiff_path):
+    """Read the geotransform and corner coordinates of a TIFF.
+
+    Uses the GDAL Python bindings in-process when installed, which is a
+    header read; otherwise spawns `gdalinfo -json` and parses its output.
+
+    Returns (geotransform, corner_coordinates) in the gdalinfo JSON shape,
+    or None if the file has no geotransform or GDAL is unavailable.
+    """
+    if not _HAS_GDAL:
+        return _read_gdalinfo_corners(tiff_path)
+
+    ds = gdal.Open(tiff_path)
+    try:
+        gt = list(ds.GetGeoTransform(can_return_null=True) or [])
+        w, h = ds.RasterXSize, ds.RasterYSize
+    finally:
+        ds = None
+    if not gt:
+        return None
+
+    def corner(px, py):
+        return [gt[0] + px * gt[1] + py * gt[2], gt[3] + px * gt[4] + py * gt[5]]
+
+    return gt, {
+        'upperLeft': corner(0, 0),
+        'upperRight': corner(w, 0),
+        'lowerLeft': corner(0, h),
+        'lowerRight': corner(w, h),
+    }
+
+
+def _read_gdalinfo_corners(tiff_path):
+    """_read_gdal_corners fallback that shells out to gdalinfo."""
+    result = subprocess.run(
+        ['gdalinfo', '-json', tiff_path],
+        capture_output=True,
+        timeout=30
+    )
+    if result.returncode != 0:
+        return None
+
+    # Parse the raw stdout bytes; json.loads also accepts bytes
+    info = _json_loads(result.stdout)
+    return info.get('geoTransform'), info.get('cornerCoordinates', {})
+
+
 def _extract_gdal_metadata(tiff_path):
-    """Extract georeference info using gdalinfo if available."""
+    """Extract georeference info using GDAL if available."""
     try:
-        result = subprocess.run(
-            ['gdalinfo', '-json', tiff_path],
-            capture_output=True,
-            text=True,
-            timeout=30
-        )
-        if result.returncode != 0:
+        gdal_info = _read_gdal_corners(tiff_path)
+        if gdal_info is None:
             return None
-
-        info = json.loads(result.stdout)
+        gt, corner_coords = gdal_info
 
         # Check if geotransform exists and is not identity
-        gt = info.get('geoTransform')
         if not gt or gt == [0, 1, 0, 0, 0, 1]:
             return None
 
         # Get corner coordinates
-        corner_coords = info.get('cornerCoordinates', {})
         if not corner_coords:
             return None
 
@@ -202,64 +319,48 @@ def _extract_gdal_metadata(tiff_path):
 
 
 def _extract_gps_exif(tiff_path):
-    """Extract GPS coordinates from EXIF tags."""
+    """Extract GPS coordinates from EXIF tags.
+
+    Reads only the GPS sub-IFD (and FocalLength from the Exif sub-IFD)
+    rather than decoding and name-mapping every EXIF tag.
+    """
     try:
         with Image.open(tiff_path) as img:
-            exif_data = img._getexif()
-            if not exif_data:
-                return None
-
-            # Find GPSInfo tag
-            gps_info = None
-            for tag_id, value in exif_data.items():
-                tag_name = TAGS.get(tag_id, tag_id)
-                if tag_name == 'GPSInfo':
-                    gps_info = value
-                    break
-
+            exif = img.getexif()
+            gps_info = exif.get_ifd(GPS_IFD)
             if not gps_info:
                 return None
 
-            # Decode GPS tags
-            gps_data = {}
-            for gps_tag_id, value in gps_info.items():
-                gps_tag_name = GPSTAGS.get(gps_tag_id, gps_tag_id)
-                gps_data[gps_tag_name] = value
-
             # Extract latitude
-            if 'GPSLatitude' not in gps_data or 'GPSLatitudeRef' not in gps_data:
+            if GPS_LATITUDE not in gps_info or GPS_LATITUDE_REF not in gps_info:
                 return None
 
-            lat = _convert_gps_coords(gps_data['GPSLatitude'])
-            if gps_data['GPSLatitudeRef'] == 'S':
+            lat = _convert_gps_coords(gps_info[GPS_LATITUDE])
+            if gps_info[GPS_LATITUDE_REF] == 'S':
                 lat = -lat
 
             # Extract longitude
-            if 'GPSLongitude' not in gps_data or 'GPSLongitudeRef' not in gps_data:
+            if GPS_LONGITUDE not in gps_info or GPS_LONGITUDE_REF not in gps_info:
                 return None
 
-            lon = _convert_gps_coords(gps_data['GPSLongitude'])
-            if gps_data['GPSLongitudeRef'] == 'W':
+            lon = _convert_gps_coords(gps_info[GPS_LONGITUDE])
+            if gps_info[GPS_LONGITUDE_REF] == 'W':
                 lon = -lon
 
             # Try to get altitude for better GSD estimation
             altitude = None
-            if 'GPSAltitude' in gps_data:
-                alt_value = gps_data['GPSAltitude']
-                if isinstance(alt_value, tuple) and len(alt_value) == 2:
-                    altitude = alt_value[0] / alt_value[1]
+            if GPS_ALTITUDE in gps_info:
+                altitude = _rational_to_float(gps_info[GPS_ALTITUDE])
 
             # Estimate GSD if we have focal length and sensor info
             # This is a rough estimate - real calculation needs camera specs
             gsd = None
-            focal_length = exif_data.get(37386)  # FocalLength tag
+            focal_length = exif.get_ifd(EXIF_IFD).get(EXIF_FOCAL_LENGTH)
             if focal_length and altitude:
                 # Very rough estimate: GSD ≈ (altitude * sensor_pixel_size) / focal_length
                 # Assume typical 4-5 micron pixel size for aerial cameras
                 sensor_pixel_size = 0.000005  # 5 microns in meters
-                if isinstance(focal_length, tuple):
-                    focal_length = focal_length[0] / focal_length[1]
-                focal_length_m = focal_length / 1000  # Convert mm to meters
+                focal_length_m = _rational_to_float(focal_length) / 1000  # Convert mm to meters
                 if focal_length_m > 0:
                     gsd = (altitude * sensor_pixel_size) / focal_length_m
 
@@ -273,18 +374,14 @@ def _extract_gps_exif(tiff_path):
         return None
 
 
+def _rational_to_float(value):
+    """Convert an EXIF rational (IFDRational, or a legacy (num, den) tuple) to float."""
+    if isinstance(value, tuple):
+        return value[0] / value[1]
+    return float(value)
+
+
 def _convert_gps_coords(gps_coord_tuple):
     """Convert GPS coordinate from EXIF format (degrees, minutes, seconds) to decimal."""
-    degrees = gps_coord_tuple[0]
-    minutes = gps_coord_tuple[1]
-    seconds = gps_coord_tuple[2]
-
-    # Handle rational numbers (stored as tuples)
-    if isinstance(degrees, tuple):
-        degrees = degrees[0] / degrees[1]
-    if isinstance(minutes, tuple):
-        minutes = minutes[0] / minutes[1]
-    if isinstance(seconds, tuple):
-        seconds = seconds[0] / seconds[1]
-
+    degrees, minutes, seconds = (_rational_to_float(v) for v in gps_coord_tuple[:3])
     return degrees + (minutes / 60.0) + (seconds / 3600.0)
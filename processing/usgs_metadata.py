@@ -4,11 +4,22 @@ Fetches corner coordinates and metadata for aerial single frame imagery
 when Entity ID is detected in the TIFF filename.
 """
 
+import atexit
 import os
 import re
+import threading
+import time
 import requests
 import json
-from typing import Optional, Dict
+from typing import Optional, Dict, Tuple
+
+from requests.adapters import HTTPAdapter
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
 
 
 # USGS M2M API endpoint
@@ -16,7 +27,22 @@ M2M_API_URL = "https://m2m.cr.usgs.gov/api/api/json/stable/"
 
 # Entity ID patterns for different USGS aerial collections
 # Examples: AR1131860010276, CA1234567890123, etc.
-ENTITY_ID_PATTERN = re.compile(r'[A-Z]{2}\d{13}')
+# Matched against the raw filename bytes; \d is ASCII-only on bytes patterns
+ENTITY_ID_PATTERN = re.compile(rb'[A-Z]{2}\d{13}')
+
+# M2M session tokens are valid for about 2 hours; reuse one across lookups
+# instead of a login/logout round-trip per Entity ID
+SESSION_TOKEN_LIFETIME = 7200  # seconds
+SESSION_TOKEN_MARGIN = 60  # refresh this long before the token expires
+
+# One keep-alive connection pool for every M2M request. Closed at exit
+# after the session token is logged out (atexit runs handlers in reverse)
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(pool_connections=2, pool_maxsize=4))
+atexit.register(_SESSION.close)
+
+_TOKEN_CACHE = {'token': None, 'username': None, 'expires_at': 0.0}
+_TOKEN_LOCK = threading.Lock()
 
 
 def extract_entity_id_from_filename(filename: str) -> Optional[str]:
@@ -28,13 +54,11 @@ def extract_entity_id_from_filename(filename: str) -> Optional[str]:
     Returns:
         Entity ID string if found, None otherwise
     """
-    # Remove extension and path
-    basename = os.path.splitext(os.path.basename(filename))[0]
-
-    # Search for Entity ID pattern
-    match = ENTITY_ID_PATTERN.search(basename)
+    # Only the final path component counts. The pattern can't span the
+    # '.' before the extension, so there's no need to strip it
+    match = ENTITY_ID_PATTERN.search(os.fsencode(os.path.basename(filename)))
     if match:
-        return match.group(0)
+        return match.group(0).decode('ascii')
 
     return None
 
@@ -56,52 +80,105 @@ def fetch_metadata_from_usgs(entity_id: str, api_key: Optional[str] = None) -> O
     if not api_key:
         api_key = os.environ.get('USGS_M2M_API_KEY')
 
-    # First, we need to login if we have credentials
-    session_token = None
-    username = os.environ.get('USGS_USERNAME')
-    password = os.environ.get('USGS_PASSWORD')
-
-    if username and password:
-        session_token = _login_to_usgs(username, password)
-
-    if not session_token:
+    credentials = _get_credentials()
+    if not credentials:
         # Without authentication, we cannot access the API
         # Fall back to parsing from EarthExplorer metadata XML if available
         return None
 
     try:
         # Use scene-metadata endpoint to get details
-        url = M2M_API_URL + "scene-metadata"
-
-        payload = {
+        data = _m2m_request("scene-metadata", {
             "datasetName": "aerial_combin",  # Combined aerial dataset
             "entityId": entity_id,
             "metadataType": "full"
-        }
+        }, *credentials)
+
+        if not data or not data.get('data'):
+            return None
+
+        # Extract corner coordinates from metadata
+        return _parse_usgs_metadata(data['data'])
+
+    except Exception:
+        return None
+
+
+def _get_credentials() -> Optional[Tuple[str, str]]:
+    """Return (username, password) from the environment, or None."""
+    username = os.environ.get('USGS_USERNAME')
+    password = os.environ.get('USGS_PASSWORD')
+    if username and password:
+        return username, password
+    return None
+
+
+def _m2m_request(endpoint: str, payload: Dict, username: str, password: str) -> Optional[Dict]:
+    """POST to an authenticated M2M endpoint using the cached session token.
+
+    Logs in again and retries once if the token was rejected.
+
+    Returns:
+        Parsed JSON response, or None on login failure or a non-200 status
+    """
+    url = M2M_API_URL + endpoint
+    for refresh in (False, True):
+        session_token = _get_session_token(username, password, refresh=refresh)
+        if not session_token:
+            return None
 
         headers = {
             "Content-Type": "application/json",
             "X-Auth-Token": session_token
         }
 
-        response = requests.post(url, json=payload, headers=headers, timeout=30)
+        response = _SESSION.post(url, json=payload, headers=headers, timeout=30)
+        if response.status_code != 401:
+            break
+        # Token expired or was revoked server-side; log in again once
 
-        if response.status_code != 200:
-            return None
+    if response.status_code != 200:
+        return None
 
-        data = response.json()
+    return _json_loads(response.content)
 
-        if not data.get('data'):
-            return None
 
-        # Extract corner coordinates from metadata
-        return _parse_usgs_metadata(data['data'])
+def _get_session_token(username: str, password: str, refresh: bool = False) -> Optional[str]:
+    """Return a cached M2M session token, logging in if needed.
 
-    except Exception:
-        return None
-    finally:
-        if session_token:
-            _logout_from_usgs(session_token)
+    Args:
+        username: USGS account username
+        password: USGS account password
+        refresh: Discard the cached token and log in again
+
+    Returns:
+        Session token string, or None if login failed
+    """
+    with _TOKEN_LOCK:
+        cached = _TOKEN_CACHE['token']
+        if (cached and not refresh and _TOKEN_CACHE['username'] == username
+                and time.time() < _TOKEN_CACHE['expires_at'] - SESSION_TOKEN_MARGIN):
+            return cached
+
+        token = _login_to_usgs(username, password)
+        if token:
+            _TOKEN_CACHE.update(
+                token=token,
+                username=username,
+                expires_at=time.time() + SESSION_TOKEN_LIFETIME,
+            )
+        return token
+
+
+def _logout_cached_session():
+    """Log out the cached session token, if any (runs at interpreter exit)."""
+    token = _TOKEN_CACHE['token']
+    if token:
+        _TOKEN_CACHE['token'] = None
+        _logout_from_usgs(token)
+
+
+atexit.register(_logout_cached_session)
 
 
 def _login_to_usgs(username: str, password: str) -> Optional[str]:
@@ -113,10 +190,10 @@ def _login_to_usgs(username: str, password: str) -> Optional[str]:
             "password": password
         }
 
-        response = requests.post(url, json=payload, timeout=10)
+        response = _SESSION.post(url, json=payload, timeout=10)
 
         if response.status_code == 200:
-            data = response.json()
+            data = _json_loads(response.content)
             return data.get('data')
 
         return None
@@ -129,7 +206,7 @@ def _logout_from_usgs(session_token: str):
     try:
         url = M2M_API_URL + "logout"
         headers = {"X-Auth-Token": session_token}
-        requests.post(url, headers=headers, timeout=5)
+        _SESSION.post(url, headers=headers, timeout=5)
     except Exception:
         pass
 
@@ -206,3 +283,4 @@ def try_fetch_usgs_metadata(tiff_path: str) -> Optional[Dict]:
         return None
 
     return fetch_metadata_from_usgs(entity_id)
+
@@ -1,9 +1,28 @@
 import json
+import logging
 import os
 import subprocess
-import tempfile
+import uuid
 import xml.etree.ElementTree as ET
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+try:
+    from osgeo import gdal, ogr, osr
+    gdal.UseExceptions()
+    _HAS_OGR = True
+except ImportError:
+    _HAS_OGR = False
+
+log = logging.getLogger(__name__)
 
 # Map of file extensions to format type
 SUPPORTED_EXTENSIONS = {
@@ -22,6 +41,12 @@ PYTHON_NATIVE_FORMATS = {'.kmz', '.kml', '.geojson', '.json'}
 # Formats that commonly have multiple internal layers
 MULTI_LAYER_FORMATS = {'.gpx', '.kmz', '.kml'}
 
+# GDAL virtual file that writes to the process's stdout
+OGR_STDOUT = '/vsistdout/'
+
+# KML geometry types, in the order a Placemark's geometry is chosen
+_GEOMETRY_PRECEDENCE = ('Point', 'LineString', 'Polygon', 'MultiGeometry')
+
 
 def convert_to_geojson(input_path, original_filename):
     """Convert a vector file to GeoJSON in EPSG:4326.
@@ -48,7 +73,7 @@ def convert_to_geojson(input_path, original_filename):
             if result is not None:
                 return result
         except Exception as e:
-            print(f'[vector_handler] Native conversion failed for {ext}: {e}')
+            log.warning('Native conversion failed for %s: %s', ext, e)
             # Fall through to ogr2ogr
 
     # Fall back to ogr2ogr for shapefiles and anything native couldn't handle
@@ -60,9 +85,8 @@ def _convert_native(input_path, ext):
     if ext == '.kmz':
         return _convert_kmz(input_path)
     elif ext == '.kml':
-        with open(input_path, 'r', encoding='utf-8', errors='replace') as f:
-            kml_text = f.read()
-        return _convert_kml_text(kml_text)
+        with open(input_path, 'rb') as f:
+            return _convert_kml_stream(f)
     elif ext in ('.geojson', '.json'):
         return _convert_geojson_file(input_path)
     return None
@@ -81,14 +105,16 @@ def _convert_kmz(input_path):
             if not kml_names:
                 return {'error': 'No KML file found inside KMZ archive'}
 
+            # Every KML's placemarks go straight into the one feature list
             all_features = []
             for kml_name in kml_names:
-                kml_text = zf.read(kml_name).decode('utf-8', errors='replace')
-                result = _convert_kml_text(kml_text)
-                if result and 'geojson' in result:
-                    all_features.extend(
-                        result['geojson'].get('features', [])
-                    )
+                start = len(all_features)
+                # Parse straight from the decompressing stream
+                with zf.open(kml_name) as kml_file:
+                    error = _collect_kml_features(kml_file, all_features.append)
+                if error:
+                    # Drop a broken KML's partial features, keep the rest
+                    del all_features[start:]
 
             if not all_features:
                 return {'error': 'No geographic features found in KMZ'}
@@ -106,29 +132,12 @@ def _convert_kmz(input_path):
         return {'error': 'Invalid KMZ file (not a valid ZIP archive)'}
 
 
-def _convert_kml_text(kml_text):
-    """Parse KML XML text and convert placemarks to GeoJSON."""
-    try:
-        root = ET.fromstring(kml_text)
-    except ET.ParseError as e:
-        return {'error': f'Failed to parse KML: {e}'}
-
-    # KML namespace
-    ns = ''
-    tag = root.tag
-    if tag.startswith('{'):
-        ns = tag[1:tag.index('}')]
-
-    def ns_tag(local):
-        return f'{{{ns}}}{local}' if ns else local
-
+def _convert_kml_stream(kml_file):
+    """Parse KML from a binary file object and convert placemarks to GeoJSON."""
     features = []
-
-    # Find all Placemark elements (recursively)
-    for pm in root.iter(ns_tag('Placemark')):
-        feature = _placemark_to_feature(pm, ns_tag)
-        if feature is not None:
-            features.append(feature)
+    error = _collect_kml_features(kml_file, features.append)
+    if error:
+        return {'error': error}
 
     if not features:
         return None  # Signal to try ogr2ogr fallback
@@ -143,36 +152,98 @@ def _convert_kml_text(kml_text):
     }
 
 
+def _collect_kml_features(kml_file, append):
+    """Stream KML placemarks from a binary file object into a callback.
+
+    Streams the document with iterparse, converting each Placemark as it
+    closes and then clearing it, so memory stays at about one placemark
+    rather than the whole tree. The parser decodes bytes itself, honouring
+    the XML encoding declaration.
+
+    Args:
+        kml_file: Binary file object positioned at the start of the KML.
+        append: Called with each GeoJSON Feature as it is converted.
+
+    Returns:
+        None on success, or an error message if the KML failed to parse
+        (features before the error will already have been passed on).
+    """
+    ns = None
+    placemark_tag = None
+
+    def ns_tag(local):
+        return f'{{{ns}}}{local}' if ns else local
+
+    try:
+        for event, elem in ET.iterparse(kml_file, events=('start', 'end')):
+            if ns is None:
+                # KML namespace, taken from the root element
+                tag = elem.tag
+                ns = tag[1:tag.index('}')] if tag.startswith('{') else ''
+                placemark_tag = ns_tag('Placemark')
+
+            if event == 'end' and elem.tag == placemark_tag:
+                feature = _placemark_to_feature(elem, ns_tag)
+                if feature is not None:
+                    append(feature)
+                elem.clear()
+    except ET.ParseError as e:
+        return f'Failed to parse KML: {e}'
+
+    return None
+
+
 def _placemark_to_feature(pm, ns_tag):
-    """Convert a single KML Placemark to a GeoJSON Feature."""
-    properties = {}
+    """Convert a single KML Placemark to a GeoJSON Feature.
+
+    Walks the placemark subtree once, picking up the name, description,
+    ExtendedData values and the first element of each geometry type as
+    they go by, instead of a separate find() walk for each of them.
+    """
+    name_tag = ns_tag('name')
+    desc_tag = ns_tag('description')
+    simple_data_tag = ns_tag('SimpleData')
+    data_tag = ns_tag('Data')
+    geometry_tags = {ns_tag(t): t for t in _GEOMETRY_PRECEDENCE}
+
+    name = desc = None
+    simple_data = []
+    data = []
+    found = {}
+    for el in pm.iter():
+        tag = el.tag
+        if tag in geometry_tags:
+            found.setdefault(geometry_tags[tag], el)
+        elif tag == simple_data_tag:
+            simple_data.append(el)
+        elif tag == data_tag:
+            data.append(el)
+        elif tag == name_tag:
+            if name is None:
+                name = el
+        elif tag == desc_tag:
+            if desc is None:
+                desc = el
 
-    # Name
-    name_el = pm.find(ns_tag('name'))
-    if name_el is not None and name_el.text:
-        properties['name'] = name_el.text.strip()
-
-    # Description
-    desc_el = pm.find(ns_tag('description'))
-    if desc_el is not None and desc_el.text:
-        properties['description'] = desc_el.text.strip()
-
-    # ExtendedData / SimpleData
-    ext_data = pm.find(ns_tag('ExtendedData'))
-    if ext_data is not None:
-        for sd in ext_data.iter(ns_tag('SimpleData')):
-            attr_name = sd.get('name', '')
-            if attr_name and sd.text:
-                properties[attr_name] = sd.text.strip()
-        # Also handle Data elements
-        for data_el in ext_data.iter(ns_tag('Data')):
-            attr_name = data_el.get('name', '')
-            value_el = data_el.find(ns_tag('value'))
-            if attr_name and value_el is not None and value_el.text:
-                properties[attr_name] = value_el.text.strip()
-
-    # Geometry
-    geometry = _extract_geometry(pm, ns_tag)
+    properties = {}
+    if name is not None and name.text:
+        properties['name'] = name.text.strip()
+    if desc is not None and desc.text:
+        properties['description'] = desc.text.strip()
+
+    # ExtendedData: SimpleData first, then Data, so Data wins on clashes
+    for sd in simple_data:
+        attr_name = sd.get('name', '')
+        if attr_name and sd.text:
+            properties[attr_name] = sd.text.strip()
+    value_tag = ns_tag('value')
+    for data_el in data:
+        attr_name = data_el.get('name', '')
+        value_el = data_el.find(value_tag)
+        if attr_name and value_el is not None and value_el.text:
+            properties[attr_name] = value_el.text.strip()
+
+    geometry = _extract_geometry(found, ns_tag)
     if geometry is None:
         return None
 
@@ -183,53 +254,70 @@ def _placemark_to_feature(pm, ns_tag):
     }
 
 
-def _extract_geometry(pm, ns_tag):
-    """Extract GeoJSON geometry from a Placemark element."""
-    # Point
-    point = pm.find('.//' + ns_tag('Point'))
-    if point is not None:
-        coords = point.find(ns_tag('coordinates'))
-        if coords is not None and coords.text:
-            parts = coords.text.strip().split(',')
-            if len(parts) >= 2:
-                lon, lat = float(parts[0]), float(parts[1])
-                return {'type': 'Point', 'coordinates': [lon, lat]}
-
-    # LineString
-    line = pm.find('.//' + ns_tag('LineString'))
-    if line is not None:
-        coords_el = line.find(ns_tag('coordinates'))
-        if coords_el is not None and coords_el.text:
-            coords = _parse_coord_string(coords_el.text)
-            if coords:
-                return {'type': 'LineString', 'coordinates': coords}
-
-    # Polygon
-    polygon = pm.find('.//' + ns_tag('Polygon'))
-    if polygon is not None:
-        return _parse_polygon(polygon, ns_tag)
-
-    # MultiGeometry
-    multi = pm.find('.//' + ns_tag('MultiGeometry'))
-    if multi is not None:
-        geometries = []
-        for child_pm_type in ['Point', 'LineString', 'Polygon']:
-            for child in multi.findall(ns_tag(child_pm_type)):
-                # Create a temporary wrapper to reuse extraction
-                wrapper = ET.Element('tmp')
-                wrapper.append(child)
-                geom = _extract_geometry(wrapper, ns_tag)
-                if geom:
-                    geometries.append(geom)
-        if geometries:
-            return {
-                'type': 'GeometryCollection',
-                'geometries': geometries,
-            }
 
+def _extract_geometry(found, ns_tag):
+    """Build GeoJSON geometry from the first element of each geometry type.
+
+    Args:
+        found: Dict mapping 'Point', 'LineString', 'Polygon' and
+            'MultiGeometry' to the first such element in the placemark.
+        ns_tag: Function qualifying a local tag name with the KML namespace.
+
+    Returns:
+        GeoJSON geometry dict, or None if no usable geometry was found.
+    """
+    for geom_type in _GEOMETRY_PRECEDENCE:
+        el = found.get(geom_type)
+        if el is None:
+            continue
+        if geom_type == 'MultiGeometry':
+            return _parse_multi_geometry(el, ns_tag)
+        geom = _GEOMETRY_PARSERS[geom_type](el, ns_tag)
+        # An unusable Point or LineString falls through to the next type;
+        # a Polygon is final either way
+        if geom is not None or geom_type == 'Polygon':
+            return geom
+    return None
+
+
+def _parse_point(point_el, ns_tag):
+    """Parse a KML Point into GeoJSON Point geometry."""
+    coords = point_el.find(ns_tag('coordinates'))
+    if coords is not None and coords.text:
+        parts = coords.text.strip().split(',')
+        if len(parts) >= 2:
+            lon, lat = float(parts[0]), float(parts[1])
+            return {'type': 'Point', 'coordinates': [lon, lat]}
     return None
 
 
+def _parse_line_string(line_el, ns_tag):
+    """Parse a KML LineString into GeoJSON LineString geometry."""
+    coords_el = line_el.find(ns_tag('coordinates'))
+    if coords_el is not None and coords_el.text:
+        coords = _parse_coord_string(coords_el.text)
+        if coords:
+            return {'type': 'LineString', 'coordinates': coords}
+    return None
+
+
+def _parse_multi_geometry(multi_el, ns_tag):
+    """Parse a KML MultiGeometry's direct children into a GeometryCollection."""
+    geometries = []
+    for child_type in ('Point', 'LineString', 'Polygon'):
+        parse = _GEOMETRY_PARSERS[child_type]
+        for child in multi_el.findall(ns_tag(child_type)):
+            geom = parse(child, ns_tag)
+            if geom:
+                geometries.append(geom)
+    if not geometries:
+        return None
+    return {
+        'type': 'GeometryCollection',
+        'geometries': geometries,
+    }
+
+
 def _parse_polygon(polygon_el, ns_tag):
     """Parse a KML Polygon into GeoJSON Polygon geometry."""
     rings = []
@@ -261,8 +349,32 @@ def _parse_polygon(polygon_el, ns_tag):
     return {'type': 'Polygon', 'coordinates': rings}
 
 
+_GEOMETRY_PARSERS = {
+    'Point': _parse_point,
+    'LineString': _parse_line_string,
+    'Polygon': _parse_polygon,
+}
+
+
 def _parse_coord_string(text):
     """Parse KML coordinate string 'lon,lat[,alt] lon,lat[,alt] ...' to list of [lon, lat]."""
+    tokens = text.split()
+    if not tokens:
+        return []
+
+    # Fast path: every tuple has the same number of values, so the whole
+    # string parses as one flat float array in C and reshapes by stride.
+    # Check each tuple; a matching comma total can hide mixed strides.
+    stride = tokens[0].count(',') + 1
+    if stride >= 2 and all(t.count(',') == stride - 1 for t in tokens):
+        try:
+            values = np.array(text.replace(',', ' ').split(), dtype=np.float64)
+        except ValueError:
+            values = None
+        if values is not None and values.size == len(tokens) * stride:
+            return values.reshape(-1, stride)[:, :2].tolist()
+
+    # Mixed or malformed tuples: parse token by token, skipping bad ones
     coords = []
     for token in text.strip().split():
         parts = token.strip().split(',')
@@ -281,8 +393,8 @@ def _parse_coord_string(text):
 
 def _convert_geojson_file(input_path):
     """Load a GeoJSON file and return it."""
-    with open(input_path, 'r', encoding='utf-8', errors='replace') as f:
-        geojson_data = json.load(f)
+    with open(input_path, 'rb') as f:
+        geojson_data = _json_loads(f.read())
 
     # Handle bare geometry or single feature
     if geojson_data.get('type') == 'Feature':
@@ -354,38 +466,73 @@ def _convert_with_ogr2ogr(input_path, ext):
 
 def _try_simple_convert(source):
     """Attempt a single-pass ogr2ogr conversion. Returns result dict or None on failure."""
-    output_path = _make_temp_path()
-    try:
+    if _HAS_OGR:
+        # Same conversion through the bindings, without a process launch
+        # and GDAL start-up
+        output = _vector_translate_in_process(source)
+        if output is None:
+            return None  # Signal to try multi-layer approach
+    else:
+        # GeoJSON goes straight down the stdout pipe; no temp file round trip
         cmd = [
             'ogr2ogr',
             '-f', 'GeoJSON',
             '-t_srs', 'EPSG:4326',
-            output_path,
+            OGR_STDOUT,
             source,
         ]
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
+        result = subprocess.run(cmd, capture_output=True, timeout=120)
 
         if result.returncode != 0:
             return None  # Signal to try multi-layer approach
+        output = result.stdout
+
+    geojson_data = _json_loads(output)
+
+    feature_count = len(geojson_data.get('features', []))
+    if feature_count == 0:
+        return None
+
+    return {
+        'geojson': geojson_data,
+        'feature_count': feature_count,
+    }
 
-        with open(output_path, 'r') as f:
-            geojson_data = json.load(f)
 
-        feature_count = len(geojson_data.get('features', []))
-        if feature_count == 0:
+def _vector_translate_in_process(source):
+    """Run the single-pass conversion with gdal.VectorTranslate.
+
+    The GeoJSON is written to a uniquely named /vsimem/ buffer and read
+    back as bytes. Returns the GeoJSON bytes, or None if GDAL failed.
+    """
+    out_path = f'/vsimem/mapsync_{uuid.uuid4().hex}.geojson'
+    try:
+        options = gdal.VectorTranslateOptions(format='GeoJSON', dstSRS='EPSG:4326')
+        ds = gdal.VectorTranslate(out_path, source, options=options)
+        if ds is None:
             return None
+        ds = None  # Close to flush the GeoJSON to /vsimem/
 
-        return {
-            'geojson': geojson_data,
-            'feature_count': feature_count,
-        }
+        f = gdal.VSIFOpenL(out_path, 'rb')
+        try:
+            return gdal.VSIFReadL(1, gdal.VSIStatL(out_path).size, f)
+        finally:
+            gdal.VSIFCloseL(f)
+    except Exception as e:
+        log.warning('In-process VectorTranslate failed: %s', e)
+        return None
     finally:
-        if os.path.exists(output_path):
-            os.remove(output_path)
+        if gdal.VSIStatL(out_path) is not None:
+            gdal.Unlink(out_path)
 
 
 def _try_multilayer_convert(source):
     """Handle multi-layer sources by listing layers and converting each one."""
+    if _HAS_OGR:
+        result = _convert_layers_in_process(source)
+        if result is not None:
+            return result
+
     # List available layers
     result = subprocess.run(
         ['ogrinfo', '-so', '-al', source],
@@ -401,31 +548,14 @@ def _try_multilayer_convert(source):
     if not layer_names:
         return {'error': 'No layers found in the uploaded file'}
 
-    # Convert each layer to GeoJSON and merge all features
+    # Convert the layers in parallel (each ogr2ogr is its own process, and
+    # the threads just wait on it) and merge the features in layer order
     all_features = []
-    for layer_name in layer_names:
-        output_path = _make_temp_path()
-        try:
-            cmd = [
-                'ogr2ogr',
-                '-f', 'GeoJSON',
-                '-t_srs', 'EPSG:4326',
-                output_path,
-                source,
-                layer_name,
-            ]
-            lr = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
-            if lr.returncode != 0:
-                continue  # Skip layers that fail (e.g. empty layers)
-
-            with open(output_path, 'r') as f:
-                layer_geojson = json.load(f)
-
-            features = layer_geojson.get('features', [])
+    workers = min(len(layer_names), os.cpu_count() or 4)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for features in pool.map(lambda name: _convert_one_layer(source, name),
+                                 layer_names):
             all_features.extend(features)
-        finally:
-            if os.path.exists(output_path):
-                os.remove(output_path)
 
     if not all_features:
         return {'error': 'No features found in any layer of the uploaded file'}
@@ -441,9 +571,66 @@ def _try_multilayer_convert(source):
     }
 
 
-def _make_temp_path():
-    """Create a temporary file path for GeoJSON output (file does not exist)."""
-    fd, path = tempfile.mkstemp(suffix='.geojson')
-    os.close(fd)
-    os.remove(path)
-    return path
+def _convert_one_layer(source, layer_name):
+    """Convert one layer with ogr2ogr. Returns its features, or [] on failure."""
+    cmd = [
+        'ogr2ogr',
+        '-f', 'GeoJSON',
+        '-t_srs', 'EPSG:4326',
+        OGR_STDOUT,
+        source,
+        layer_name,
+    ]
+    lr = subprocess.run(cmd, capture_output=True, timeout=120)
+    if lr.returncode != 0:
+        return []  # Skip layers that fail (e.g. empty layers)
+
+    layer_geojson = _json_loads(lr.stdout)
+    return layer_geojson.get('features', [])
+
+
+def _convert_layers_in_process(source):
+    """Read every layer with the OGR bindings and merge the features.
+
+    Same result as running ogr2ogr once per layer, without an ogrinfo
+    call, a process per layer and a temp GeoJSON file per layer.
+    Returns a result dict, or None to fall back to the ogr2ogr path.
+    """
+    try:
+        ds = ogr.Open(source)
+        if ds is None:
+            return None
+
+        wgs84 = osr.SpatialReference()
+        wgs84.ImportFromEPSG(4326)
+        wgs84.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+
+        all_features = []
+        for i in range(ds.GetLayerCount()):
+            layer = ds.GetLayer(i)
+            transform = None
+            layer_srs = layer.GetSpatialRef()
+            if layer_srs is not None and not layer_srs.IsSame(wgs84):
+                layer_srs.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+                transform = osr.CoordinateTransformation(layer_srs, wgs84)
+
+            for feature in layer:
+                geom = feature.GetGeometryRef()
+                if geom is not None and transform is not None:
+                    geom.Transform(transform)
+                all_features.append(_json_loads(feature.ExportToJson()))
+        ds = None
+    except Exception as e:
+        log.warning('In-process OGR conversion failed: %s', e)
+        return None
+
+    if not all_features:
+        return None
+
+    return {
+        'geojson': {
+            'type': 'FeatureCollection',
+            'features': all_features,
+        },
+        'feature_count': len(all_features),
+    }
@@ -7,10 +7,49 @@ USGS download packages typically contain:
 - README.txt - Instructions
 """
 
+import logging
 import os
+import re
+import shutil
+import struct
 import zipfile
-import tempfile
-from typing import Optional, Dict, List
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional, Dict, List, Tuple, Union
+
+from processing.config import UPLOAD_FOLDER, TEMP_EXTRACT_FOLDER
+
+log = logging.getLogger(__name__)
+
+# 1 MiB copy buffer for streaming members out of the archive
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# Package member roles, tried in order; the matching group number
+# (match.lastindex) gives the role
+_PACKAGE_MEMBER_RE = re.compile(
+    r'(.*\.tiff?)\Z'                        # 1: TIFF
+    r'|(.*\.(?:tfw|tifw|tiffw))\Z'          # 2: world file
+    r'|(.*footprint\.geojson)'              # 3: footprint GeoJSON
+    r'|((?:.*/)?readme\.txt)\Z',            # 4: README
+    re.IGNORECASE | re.DOTALL,
+)
+_PACKAGE_MEMBER_ROLES = (None, 'tiff', 'worldfile', 'footprint', 'readme')
+
+# macOS archive noise: the __MACOSX/ resource fork tree and AppleDouble
+# '._' files, which sit next to the real ones with the same extension
+_SKIP_PREFIXES = ('__MACOSX', '._')
+_APPLEDOUBLE_MARKER = '/._'
+
+# Fixed part of a ZIP local file header; member data follows it, the
+# file name and the extra field
+LOCAL_HEADER_SIZE = 30
+LOCAL_HEADER_SIGNATURE = b'PK\x03\x04'
+
+# What zipfile raises for a damaged or unreadable archive: corrupt
+# structure or CRC, a corrupt deflate stream, an encrypted member and an
+# unsupported compression method
+_BAD_ARCHIVE_ERRORS = (zipfile.BadZipFile, zlib.error, RuntimeError, NotImplementedError)
 
 
 def is_zipfile(filepath: str) -> bool:
@@ -21,12 +60,187 @@ def is_zipfile(filepath: str) -> bool:
         return False
 
 
-def extract_usgs_package(zip_path: str, extract_dir: str) -> Optional[Dict]:
+@dataclass
+class UsgsPackage:
+    """An open USGS package: the archive, its classified members and,
+    once extracted or streamed, the paths they were written to.
+
+    Use as a context manager (or call close()) to close the archive.
+    """
+    zf: zipfile.ZipFile
+    members: Dict[str, zipfile.ZipInfo]
+    paths: Dict[str, str] = field(default_factory=dict)
+
+    def close(self):
+        self.zf.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def open_usgs_package(zip_path: str) -> Optional[UsgsPackage]:
+    """Open a USGS package, parsing its central directory once.
+
+    Use instead of is_zipfile() followed by extract_usgs_package() or
+    stream_usgs_package(): pass the package to either so the archive isn't
+    opened, parsed and classified a second time.
+
+    Returns:
+        Open UsgsPackage, or None if the file is not a valid ZIP archive
+        or contains no TIFF
+    """
+    try:
+        zf = zipfile.ZipFile(zip_path, 'r')
+    except (zipfile.BadZipFile, OSError):
+        return None
+
+    members = _find_package_members(zf.infolist())
+    if not members:
+        zf.close()
+        return None
+    return UsgsPackage(zf, members)
+
+
+def _find_package_members(infos: List[zipfile.ZipInfo]) -> Optional[Dict[str, zipfile.ZipInfo]]:
+    """Locate the TIFF and companion files in a USGS package listing.
+
+    Args:
+        infos: Member entries from the ZIP archive (ZipFile.infolist())
+
+    Returns:
+        Dict mapping 'tiff' (and optionally 'worldfile', 'footprint',
+        'readme') to member entries, or None if no TIFF is present
+    """
+    members = {}
+
+    # One pass over the listing, classifying each member with one regex
+    # match; the first member found for each role wins
+    for info in infos:
+        filename = info.filename
+        if filename.startswith(_SKIP_PREFIXES) or _APPLEDOUBLE_MARKER in filename:
+            continue
+
+        match = _PACKAGE_MEMBER_RE.match(filename)
+        if match is None:
+            continue
+
+        role = _PACKAGE_MEMBER_ROLES[match.lastindex]
+        if role not in members:
+            members[role] = info
+            if len(members) == 4:
+                break
+
+    if 'tiff' not in members:
+        return None
+
+    return members
+
+
+def _member_path(extract_dir: str, name: str) -> str:
+    """Map a member name to a path under extract_dir.
+
+    Drops empty, '.' and '..' components the way ZipFile.extract does, so a
+    crafted member name can't write outside extract_dir.
+    """
+    parts = [p for p in name.replace('\\', '/').split('/') if p not in ('', '.', '..')]
+    return os.path.join(extract_dir, *parts)
+
+
+def _copy_member(zip_ref: zipfile.ZipFile, info: zipfile.ZipInfo, dest: str):
+    """Decompress one archive member to dest through a 1 MiB buffer.
+
+    Stored (uncompressed) members, common for TIFFs that are already
+    JPEG- or LZW-compressed inside, are copied by the kernel instead.
+    The member is written to a preallocated temp file and renamed into
+    place, so a failed copy never leaves a full-size dest behind.
+    """
+    tmp_path = dest + '.tmp'
+    try:
+        with _open_preallocated(tmp_path, info.file_size) as out:
+            if (info.compress_type == zipfile.ZIP_STORED and not info.flag_bits & 0x1
+                    and zip_ref.filename and hasattr(os, 'sendfile')):
+                _sendfile_stored_member(zip_ref.filename, info, out)
+            else:
+                with zip_ref.open(info) as src:
+                    shutil.copyfileobj(src, out, COPY_BUFFER_SIZE)
+        os.replace(tmp_path, dest)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _open_preallocated(path: str, size: int):
+    """Open path for binary writing with size bytes allocated up front.
+
+    One extent allocation instead of growing the file a buffer at a time,
+    which keeps large TIFFs contiguous and cuts filesystem metadata writes.
+    """
+    out = open(path, 'wb')
+    if size and hasattr(os, 'posix_fallocate'):
+        try:
+            os.posix_fallocate(out.fileno(), 0, size)
+        except OSError:
+            pass  # Filesystem doesn't support it; the file just grows
+    return out
+
+
+def _sendfile_stored_member(zip_path: str, info: zipfile.ZipInfo, out):
+    """Copy a stored member's bytes into the open file out with os.sendfile.
+
+    The data never passes through user space. Unlike ZipFile.open() the
+    CRC is not checked, since that would mean reading the data anyway.
+    """
+    with open(zip_path, 'rb') as src:
+        # The local header's name and extra field lengths can differ from
+        # the central directory's, so read them to find where data starts
+        header = os.pread(src.fileno(), LOCAL_HEADER_SIZE, info.header_offset)
+        if len(header) != LOCAL_HEADER_SIZE or header[:4] != LOCAL_HEADER_SIGNATURE:
+            raise zipfile.BadZipFile(f'Bad local file header for {info.filename}')
+        name_len, extra_len = struct.unpack_from('<HH', header, 26)
+
+        offset = info.header_offset + LOCAL_HEADER_SIZE + name_len + extra_len
+        remaining = info.file_size
+        while remaining:
+            sent = os.sendfile(out.fileno(), src.fileno(), offset, remaining)
+            if not sent:
+                raise zipfile.BadZipFile(f'Truncated data for {info.filename}')
+            offset += sent
+            remaining -= sent
+
+
+def _copy_members(zip_path: str, jobs: List[Tuple[zipfile.ZipInfo, str]]):
+    """Copy (member entry, dest) pairs out of the archive concurrently.
+
+    The small sidecars finish while the TIFF is still being inflated.
+    Each job opens its own ZipFile on zip_path, since a ZipFile's shared
+    file handle isn't safe to use from several threads; zlib releases
+    the GIL, so the decompression genuinely overlaps.
+    """
+    if not jobs:
+        return
+    with ThreadPoolExecutor(max_workers=min(len(jobs), 4)) as pool:
+        list(pool.map(lambda job: _copy_member_from_path(zip_path, *job), jobs))
+
+
+def _copy_member_from_path(zip_path: str, info: zipfile.ZipInfo, dest: str):
+    """_copy_member() through a ZipFile opened for this call only."""
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        _copy_member(zip_ref, info, dest)
+
+
+def extract_usgs_package(zip_path: str, extract_dir: str,
+                         package: Optional[UsgsPackage] = None) -> Optional[Dict]:
     """Extract USGS download package from ZIP file.
 
     Args:
         zip_path: Path to ZIP file
         extract_dir: Directory to extract files to
+        package: Optional open_usgs_package() result for zip_path; left
+            open, with its paths set to the extracted files
 
     Returns:
         Dict with paths to extracted files:
@@ -36,77 +250,128 @@ def extract_usgs_package(zip_path: str, extract_dir: str) -> Optional[Dict]:
             'footprint': path to _footprint.geojson (optional),
             'readme': path to README.txt (optional)
         }
-    """
-    try:
-        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            # Get list of files in archive
-            file_list = zip_ref.namelist()
-
-            # Find the TIFF file
-            tiff_files = [f for f in file_list if f.lower().endswith(('.tif', '.tiff')) and not f.startswith('__MACOSX')]
-
-            if not tiff_files:
-                return None
+        or None if the file is missing, not a valid ZIP or has no TIFF
 
-            # Use the first TIFF found
-            tiff_filename = tiff_files[0]
-            base_name = os.path.splitext(os.path.basename(tiff_filename))[0]
-
-            # Look for companion files
-            worldfile = None
-            footprint = None
-            readme = None
-
-            for filename in file_list:
-                if filename.startswith('__MACOSX'):
-                    continue
-
-                basename = os.path.basename(filename)
-                lower_name = basename.lower()
-
-                # World file (.tfw, .tifw, .tiffw)
-                if lower_name.endswith(('.tfw', '.tifw', '.tiffw')):
-                    worldfile = filename
+    Raises:
+        OSError: If the members can't be written (e.g. disk full)
+    """
+    if package is None and not os.path.isfile(zip_path):
+        return None
 
-                # Footprint GeoJSON
-                elif '_footprint.geojson' in lower_name or 'footprint.geojson' in lower_name:
-                    footprint = filename
+    zip_ref = None
+    try:
+        if package is not None:
+            zip_ref, members = package.zf, package.members
+        else:
+            zip_ref = zipfile.ZipFile(zip_path, 'r')
+            members = _find_package_members(zip_ref.infolist())
+
+        if not members:
+            return None
+
+        # Extract only the members we return, not the whole archive
+        extracted = {}
+        jobs = []
+        for role, info in members.items():
+            dest = _member_path(extract_dir, info.filename)
+            extracted[role] = dest
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            jobs.append((info, dest))
+
+        _copy_members(zip_path, jobs)
+
+        if package is not None:
+            package.paths = dict(extracted)
+        return extracted
+
+    except _BAD_ARCHIVE_ERRORS:
+        return None
+    except OSError as e:
+        # Disk full, permissions, etc. are not an invalid archive
+        log.error('Failed to extract %s: %s', zip_path, e)
+        raise
+    finally:
+        if package is None and zip_ref is not None:
+            zip_ref.close()
 
-                # README
-                elif lower_name == 'readme.txt':
-                    readme = filename
 
-            # Extract files
-            zip_ref.extractall(extract_dir)
+def stream_usgs_package(zip_path: str, destinations: Dict[str, str],
+                        package: Optional[UsgsPackage] = None) -> Optional[Dict]:
+    """Stream USGS package members straight to their final paths.
 
-            result = {
-                'tiff': os.path.join(extract_dir, tiff_filename),
-            }
+    Unlike extract_usgs_package(), nothing is written to a scratch directory:
+    each wanted member is decompressed once, directly into its destination.
 
-            if worldfile:
-                result['worldfile'] = os.path.join(extract_dir, worldfile)
+    Args:
+        zip_path: Path to ZIP file
+        destinations: Dict mapping roles ('tiff', 'worldfile', 'footprint',
+            'readme') to output paths; roles not listed are skipped
+        package: Optional open_usgs_package() result for zip_path; left
+            open, with its paths set to the written files
 
-            if footprint:
-                result['footprint'] = os.path.join(extract_dir, footprint)
+    Returns:
+        Dict mapping each role that was written to its output path,
+        or None if the archive is invalid or contains no TIFF
 
-            if readme:
-                result['readme'] = os.path.join(extract_dir, readme)
+    Raises:
+        OSError: If the members can't be written (e.g. disk full); any
+            partially written outputs are removed first
+    """
+    zip_ref = None
+    result = {}
+    try:
+        if package is not None:
+            zip_ref, members = package.zf, package.members
+        else:
+            zip_ref = zipfile.ZipFile(zip_path, 'r')
+            members = _find_package_members(zip_ref.infolist())
+
+        if not members:
+            return None
+
+        for role in members:
+            dest = destinations.get(role)
+            if dest:
+                result[role] = dest
+
+        _copy_members(zip_path, [(members[role], dest) for role, dest in result.items()])
+        if package is not None:
+            package.paths = dict(result)
+        return result
+
+    except _BAD_ARCHIVE_ERRORS:
+        _remove_partial(result)
+        return None
+    except OSError as e:
+        # Disk full, permissions, etc. are not an invalid archive
+        _remove_partial(result)
+        log.error('Failed to extract %s: %s', zip_path, e)
+        raise
+    finally:
+        if package is None and zip_ref is not None:
+            zip_ref.close()
 
-            return result
 
-    except (zipfile.BadZipFile, Exception) as e:
-        return None
+def _remove_partial(paths: Dict[str, str]):
+    """Remove whatever stream_usgs_package() managed to write."""
+    for path in paths.values():
+        if os.path.exists(path):
+            os.remove(path)
 
 
-def get_package_info(extracted_files: Dict) -> str:
+def get_package_info(extracted_files: Union[Dict, UsgsPackage]) -> str:
     """Get human-readable info about extracted package.
 
     Args:
-        extracted_files: Dict from extract_usgs_package()
+        extracted_files: Dict from extract_usgs_package(), or a
+            UsgsPackage after extraction
 
     Returns:
         String describing what was found
     """
+    if isinstance(extracted_files, UsgsPackage):
+        extracted_files = extracted_files.paths
+
     parts = []
 
     if extracted_files.get('tiff'):
@@ -127,30 +392,23 @@ def get_package_info(extracted_files: Dict) -> str:
     return f"USGS package with {', '.join(parts)}"
 
 
-def cleanup_extracted_files(extracted_files: Dict):
-    """Clean up extracted temporary files.
+def cleanup_extracted_files(extract_dir: str):
+    """Clean up the temporary files of one extraction.
 
     Args:
-        extracted_files: Dict from extract_usgs_package()
+        extract_dir: The extract_dir passed to extract_usgs_package(); it
+            is removed with everything in it (including subdirectories
+            such as __MACOSX/)
     """
-    if not extracted_files:
+    if not extract_dir:
         return
 
-    # Get the extraction directory from any file path
-    for file_path in extracted_files.values():
-        if file_path and os.path.exists(file_path):
-            extract_dir = os.path.dirname(file_path)
-
-            # Remove all files in the extraction directory
-            try:
-                for filename in os.listdir(extract_dir):
-                    filepath = os.path.join(extract_dir, filename)
-                    if os.path.isfile(filepath):
-                        os.remove(filepath)
-
-                # Remove the directory itself
-                os.rmdir(extract_dir)
-            except Exception:
-                pass
+    # Never take out a shared folder (or one containing it) by mistake
+    target = os.path.realpath(extract_dir)
+    for shared in (UPLOAD_FOLDER, TEMP_EXTRACT_FOLDER):
+        shared = os.path.realpath(shared)
+        if target == shared or shared.startswith(target + os.sep):
+            log.error('Refusing to remove shared folder %s', extract_dir)
+            return
 
-            break
+    shutil.rmtree(target, ignore_errors=True)
@@ -56,9 +56,6 @@ function handleFileUpload(e) {
     var file = e.target.files[0];
     if (!file) return;
 
-    var formData = new FormData();
-    formData.append('file', file);
-
     var sizeLabel = _formatFileSize(file.size);
     showLoading('Uploading ' + sizeLabel + '...');
 
@@ -72,6 +69,8 @@ function handleFileUpload(e) {
 
     var xhr = new XMLHttpRequest();
     xhr.open('POST', '/api/upload');
+    xhr.setRequestHeader('Content-Type', 'application/octet-stream');
+    xhr.setRequestHeader('X-Filename', encodeURIComponent(file.name));
 
     xhr.upload.addEventListener('progress', function (ev) {
         if (ev.lengthComputable) {
@@ -88,56 +87,19 @@ function handleFileUpload(e) {
     xhr.addEventListener('load', function () {
         if (progressWrap) progressWrap.style.display = 'none';
 
-        if (xhr.status < 200 || xhr.status >= 300) {
-            hideLoading();
-            try {
-                var d = JSON.parse(xhr.responseText);
-                alert('Upload failed: ' + (d.error || 'Unknown error'));
-            } catch (_e) {
-                alert('Upload failed: Server error (' + xhr.status + ')');
+        if (xhr.status === 202) {
+            // Accepted — validation and preview generation run in the background
+            var pending;
+            try { pending = JSON.parse(xhr.responseText); } catch (_e) {
+                hideLoading();
+                alert('Upload failed: Invalid response from server');
+                return;
             }
+            _pollUploadStatus(pending.image_id);
             return;
         }
 
-        var data;
-        try { data = JSON.parse(xhr.responseText); } catch (_e) {
-            hideLoading();
-            alert('Upload failed: Invalid response from server');
-            return;
-        }
-
-        AppState.imageId = data.image_id;
-        AppState.previewUrl = data.preview_url;
-        AppState.originalWidth = data.original_width;
-        AppState.originalHeight = data.original_height;
-        AppState.previewWidth = data.preview_width;
-        AppState.previewHeight = data.preview_height;
-        AppState.scaleFactor = data.scale_factor;
-        AppState.metadata = data.metadata;
-        AppState.gcps = [];
-        AppState.isGeoreferenced = false;
-
-        // Clear any existing GCP data
-        clearAllGcps();
-
-        // Initialize the aerial viewer
-        var placeholder = document.getElementById('aerialPlaceholder');
-        if (placeholder) placeholder.style.display = 'none';
-        AppState.aerialViewer = initAerialViewer('aerial-viewer', data.preview_url);
-
-        // Enable the Add GCP button
-        var addGcpEl = document.getElementById('addGcpBtn');
-        var rotCtrl = document.getElementById('rotationControls');
-        if (addGcpEl) addGcpEl.disabled = false;
-        if (rotCtrl) rotCtrl.style.display = 'flex';
-
-        // Display metadata info if available
-        displayMetadataInfo(data.metadata);
-
-        updateGcpStatus('Click "Add GCP" to start placing control points');
-        updateExportButton();
-
-        hideLoading();
+        _handleUploadResponse(xhr.status, xhr.responseText);
     });
 
     xhr.addEventListener('error', function () {
@@ -146,24 +108,97 @@ function handleFileUpload(e) {
         alert('Upload failed: Network error');
     });
 
-    xhr.send(formData);
+    xhr.send(file);
 
     // Reset file input so the same file can be re-uploaded
     e.target.value = '';
 }
 
+var UPLOAD_POLL_INTERVAL_MS = 500;
+
+function _pollUploadStatus(imageId) {
+    var xhr = new XMLHttpRequest();
+    xhr.open('GET', '/api/upload/status/' + encodeURIComponent(imageId));
+    xhr.addEventListener('load', function () {
+        if (xhr.status === 202) {
+            setTimeout(function () { _pollUploadStatus(imageId); }, UPLOAD_POLL_INTERVAL_MS);
+            return;
+        }
+        _handleUploadResponse(xhr.status, xhr.responseText);
+    });
+    xhr.addEventListener('error', function () {
+        hideLoading();
+        alert('Upload failed: Network error');
+    });
+    xhr.send();
+}
+
+function _handleUploadResponse(status, responseText) {
+    if (status < 200 || status >= 300) {
+        hideLoading();
+        try {
+            var d = JSON.parse(responseText);
+            alert('Upload failed: ' + (d.error || 'Unknown error'));
+        } catch (_e) {
+            alert('Upload failed: Server error (' + status + ')');
+        }
+        return;
+    }
+
+    var data;
+    try { data = JSON.parse(responseText); } catch (_e) {
+        hideLoading();
+        alert('Upload failed: Invalid response from server');
+        return;
+    }
+
+    AppState.imageId = data.image_id;
+    AppState.previewUrl = data.preview_url;
+    AppState.originalWidth = data.original_width;
+    AppState.originalHeight = data.original_height;
+    AppState.previewWidth = data.preview_width;
+    AppState.previewHeight = data.preview_height;
+    AppState.scaleFactor = data.scale_factor;
+    AppState.metadata = data.metadata;
+    AppState.gcps = [];
+    AppState.isGeoreferenced = false;
+
+    // Clear any existing GCP data
+    clearAllGcps();
+
+    // Initialize the aerial viewer
+    var placeholder = document.getElementById('aerialPlaceholder');
+    if (placeholder) placeholder.style.display = 'none';
+    AppState.aerialViewer = initAerialViewer('aerial-viewer', data.preview_url);
+
+    // Enable the Add GCP button
+    var addGcpEl = document.getElementById('addGcpBtn');
+    var rotCtrl = document.getElementById('rotationControls');
+    if (addGcpEl) addGcpEl.disabled = false;
+    if (rotCtrl) rotCtrl.style.display = 'flex';
+
+    // Display metadata info if available
+    displayMetadataInfo(data.metadata);
+
+    updateGcpStatus('Click "Add GCP" to start placing control points');
+    updateExportButton();
+
+    hideLoading();
+}
+
 function handleOverlayUpload(e) {
     var file = e.target.files[0];
     if (!file) return;
 
-    var formData = new FormData();
-    formData.append('file', file);
-
     showLoading('Processing vector overlay...');
 
     fetch('/api/overlay/upload', {
         method: 'POST',
-        body: formData,
+        headers: {
+            'Content-Type': 'application/octet-stream',
+            'X-Filename': encodeURIComponent(file.name),
+        },
+        body: file,
     })
         .then(function (resp) {
             if (!resp.ok) return resp.json().then(function (d) { throw new Error(d.error); });
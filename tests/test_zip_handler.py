@@ -0,0 +1,57 @@
+"""Tests for processing.zip_handler.
+
+Run with: python -m unittest discover tests
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+
+from processing.zip_handler import stream_usgs_package
+
+
+class StreamUsgsPackageTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.zip_path = os.path.join(self.tmp, 'package.zip')
+        self.destinations = {
+            'tiff': os.path.join(self.tmp, 'out.tif'),
+            'worldfile': os.path.join(self.tmp, 'out.tfw'),
+        }
+
+    def _write_package(self, tiff_bytes):
+        with zipfile.ZipFile(self.zip_path, 'w') as zf:
+            zf.writestr('scene.tfw', '1\n0\n0\n-1\n0\n0\n', compress_type=zipfile.ZIP_STORED)
+            zf.writestr('scene.tif', tiff_bytes, compress_type=zipfile.ZIP_DEFLATED)
+
+    def test_streams_members_to_destinations(self):
+        self._write_package(b'II*\x00' + b'\x00' * 100_000)
+
+        result = stream_usgs_package(self.zip_path, self.destinations)
+
+        self.assertEqual(result, self.destinations)
+        self.assertEqual(os.path.getsize(self.destinations['tiff']), 100_004)
+
+    def test_corrupt_deflate_member_is_invalid_package(self):
+        self._write_package(b'II*\x00' + b'\x00' * 100_000)
+        with zipfile.ZipFile(self.zip_path) as zf:
+            info = zf.getinfo('scene.tif')
+            data_start = info.header_offset + 30 + len(info.filename) + len(info.extra)
+
+        # Overwrite the start of the deflate stream with an invalid block type
+        with open(self.zip_path, 'r+b') as f:
+            f.seek(data_start)
+            f.write(b'\xff' * 16)
+
+        result = stream_usgs_package(self.zip_path, self.destinations)
+
+        self.assertIsNone(result)
+        self.assertEqual(sorted(os.listdir(self.tmp)), ['package.zip'])
+
+
+if __name__ == '__main__':
+    unittest.main()